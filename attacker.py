@@ -20,6 +20,9 @@ class Attacker:
         
         # The current suppression pattern
         self.supp_level = {}
+
+        # An optional TraceRecorder that records every suppression pattern
+        self.recorder = None
         
         # Do not print the solve logs. Remove this if you want to inspect the logs.
         self.m.setParam('OutputFlag', False)
@@ -50,11 +53,20 @@ class Attacker:
 
         # Store the suppression pattern
         self.supp_level = supp_level
+        if self.recorder:
+            self.recorder.record_pattern(supp_level)
 
         # Update bounds
-        for cell, info in self.data["cells"].items():
-            self.vars[cell].setAttr(GRB.Attr.UB, info["nominal"] + info["UB"] * supp_level[cell])
-            self.vars[cell].setAttr(GRB.Attr.LB, info["nominal"] - info["LB"] * supp_level[cell])
+        for cell in self.data["cells"].keys():
+            self.update_cell_bounds(cell, supp_level[cell])
+
+    def update_cell_bounds(self, cell, supp):
+        """Change the bounds of a single variable based on its suppression level. This does not change the stored
+        suppression pattern"""
+
+        info = self.data["cells"][cell]
+        self.vars[cell].setAttr(GRB.Attr.UB, info["nominal"] + info["UB"] * supp)
+        self.vars[cell].setAttr(GRB.Attr.LB, info["nominal"] - info["LB"] * supp)
 
     def optimise(self, target_cell, maximise):
         """Solve the attacker problem in a given direction (maximise / minimise)"""
@@ -0,0 +1,227 @@
+from multiprocessing import Pool, cpu_count
+from attacker import Attacker
+from subproblem import find_components
+import argparse
+import json
+import sys
+import os
+import time
+import read
+
+# Each worker process holds a single attacker problem whose bounds are set to the published suppression pattern once
+worker_attacker = None
+
+
+def initialise_worker(data, supp_levels):
+    """Builds the attacker problem of a worker process for a suppression pattern"""
+
+    global worker_attacker
+    worker_attacker = Attacker(data)
+    worker_attacker.update_bounds(supp_levels)
+
+
+def audit_chunk(jobs):
+    """Checks the protection levels of a chunk of jobs from the same component in a worker process. As in the sub-problem,
+    every attacker solution that reaches the nominal plus (minus) the protection level of another suppressed sensitive cell
+    in the component shows that its upper (lower) protection level is met, in which case its attacker problem is skipped.
+
+    :param jobs: a list of (sensitive cell, maximise, component cells)
+    :return: a list of results, one for each job
+    """
+
+    attacker = worker_attacker
+    data = attacker.data
+    HIGH, LOW = {}, {}
+    results = []
+    for sensitive_cell, maximise, component in jobs:
+        nominal = data["cells"][sensitive_cell]["nominal"]
+        if maximise:
+            required = nominal + data["sensitive cells"][sensitive_cell]["UPL"]
+        else:
+            required = nominal - data["sensitive cells"][sensitive_cell]["LPL"]
+
+        # A published cell is known exactly, so the attacker reaches its nominal without solving anything. The optimum of a
+        # skipped attacker problem is not known
+        if attacker.supp_level[sensitive_cell] <= 0.5:
+            optimum = nominal
+        elif (maximise and HIGH.get(sensitive_cell, nominal) >= required) or \
+                (not maximise and LOW.get(sensitive_cell, nominal) <= required):
+            optimum = None
+        else:
+            optimum = attacker.optimise(sensitive_cell, maximise)
+            for cell in component:
+                if cell in data["sensitive cells"] and attacker.supp_level[cell] > 0.5:
+                    value = attacker.vars[cell].x
+                    HIGH[cell] = max(HIGH.get(cell, value), value)
+                    LOW[cell] = min(LOW.get(cell, value), value)
+
+        violation = 0 if optimum is None else (required - optimum if maximise else optimum - required)
+        results.append({"cell": sensitive_cell,
+                        "direction": "upper" if maximise else "lower",
+                        "required": required,
+                        "optimum": optimum,
+                        "violation": max(violation, 0)})
+    return results
+
+
+def chunks(data, chunk_size):
+    """Splits the attacker problems into chunks of at most chunk_size jobs. Each chunk only contains jobs from a single
+    component so that the attacker solutions can be used to skip the other jobs of the chunk. Within a component the jobs
+    are sorted by protection level, as in the sub-problem"""
+
+    component_of, components = find_components(data)
+    jobs = {}
+    for direction, maximise in (("UPL", True), ("LPL", False)):
+        for sensitive_cell in sorted(data["sensitive cells"].keys(),
+                                     key=lambda x: data["sensitive cells"][x][direction], reverse=True):
+            component = component_of[sensitive_cell]
+            jobs.setdefault(component, []).append((sensitive_cell, maximise, components[component]))
+
+    return [component_jobs[i:i + chunk_size] for component_jobs in jobs.values()
+            for i in range(0, len(component_jobs), chunk_size)]
+
+
+def audit(data, supp_levels, workers=1, chunk_size=64):
+    """Checks the upper and lower protection level of every sensitive cell of a published suppression pattern, without a
+    master problem
+
+    :param data: returned from read.data(filename) or read.files(cell_data, reln_data)
+    :param supp_levels: a dictionary from each cell to its suppression level, e.g., returned from read.pattern
+    :param workers: the number of worker processes. If it is 1 the attacker problems are solved in this process
+    :param chunk_size: the maximum number of attacker problems sent to a worker process at a time
+    :return: a list of results, one for each sensitive cell and direction
+    """
+
+    jobs = chunks(data, chunk_size)
+    if workers > 1 and len(jobs) > 1:
+        pool = Pool(min(workers, len(jobs)), initialise_worker, (read.portable(data), supp_levels))
+        results = [result for chunk_results in pool.imap_unordered(audit_chunk, jobs) for result in chunk_results]
+        pool.close()
+        pool.join()
+    else:
+        initialise_worker(data, supp_levels)
+        results = [result for chunk in jobs for result in audit_chunk(chunk)]
+
+    return results
+
+
+def audit_file(job):
+    """Audits a single table and pattern in this process. This is used to audit the tables of a manifest in parallel
+
+    :param job: a tuple of the file name of the table, the file name of the pattern, the tolerance and the chunk size
+    :return: a dictionary with the file names, the time, the number of attacker problems and the violations
+    """
+
+    file_name, pattern_file, tolerance, chunk_size = job
+    start = time.time()
+    my_data = read.data(file_name)
+    results = audit(my_data, read.pattern(pattern_file, my_data), chunk_size=chunk_size)
+    return {"file_name": file_name,
+            "pattern": pattern_file,
+            "time": time.time() - start,
+            "checked": len(results),
+            "violations": [result for result in results if result["violation"] > tolerance]}
+
+
+def manifest(manifest_file):
+    """Reads a manifest with a table and its pattern on each line, separated by whitespace and relative to the manifest"""
+
+    base = os.path.dirname(manifest_file)
+    with open(manifest_file, "r") as f:
+        return [tuple(os.path.join(base, name) for name in line.split()[:2]) for line in f.readlines()
+                if line.strip() and not line.strip().startswith("#")]
+
+
+def arguments():
+    """Reads the arguments that can be given when executing the audit.py file. Type python audit.py --help for an explanation
+    of the different parameters
+
+    :return: an argparse object. Arguments are called by args.argument_name
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file_name", type=str, help="give relative path to data file, or to a manifest with a data file and "
+                                                    "a pattern file on each line if --manifest is given")
+
+    parser.add_argument("pattern", type=str, nargs="?", default="",
+                        help="give relative path to the published pattern, e.g., an output file of suppress.py in any mode "
+                             "and format")
+
+    parser.add_argument("--ampl_relations", type=str, default="",
+                        help="read the data in the AMPL format, where the data file holds the cells and this file the "
+                             "relations")
+
+    parser.add_argument("--manifest", action="store_true",
+                        help="audit every table of the manifest given as the file name. The tables are audited in parallel, "
+                             "each in a single process, and must be in the .csp format")
+
+    parser.add_argument("--workers", type=int, default=cpu_count(),
+                        help="the number of worker processes that solve the attacker problems")
+
+    parser.add_argument("--chunk_size", type=int, default=64,
+                        help="the maximum number of attacker problems sent to a worker process at a time")
+
+    parser.add_argument("--tolerance", type=float, default=1e-6,
+                        help="protection levels missed by at most this amount are not reported")
+
+    parser.add_argument("--report", type=str, default="",
+                        help="the file where the JSON report is stored. Nothing is stored if it is not given")
+
+    args = parser.parse_args()
+    if not args.manifest and not args.pattern:
+        parser.error("a pattern is required unless --manifest is given")
+
+    # The tables of a manifest each have their own relations, so a single AMPL relations file cannot apply to all of them
+    if args.manifest and args.ampl_relations:
+        parser.error("--ampl_relations cannot be used with --manifest")
+    return args
+
+
+def run(args):
+    """Audits a table, or every table of a manifest, prints the violated protection levels and writes the report
+
+    :param args: returned from arguments()
+    :return: a list with the summary of every table
+    """
+
+    if args.manifest:
+        jobs = [(file_name, pattern_file, args.tolerance, args.chunk_size)
+                for file_name, pattern_file in manifest(args.file_name)]
+        pool = Pool(max(1, min(args.workers, len(jobs))))
+        summaries = list(pool.imap_unordered(audit_file, jobs))
+        pool.close()
+        pool.join()
+    else:
+        start = time.time()
+        if args.ampl_relations:
+            my_data = read.files(args.file_name, args.ampl_relations)
+        else:
+            my_data = read.data(args.file_name)
+        results = audit(my_data, read.pattern(args.pattern, my_data), args.workers, args.chunk_size)
+        summaries = [{"file_name": args.file_name,
+                      "pattern": args.pattern,
+                      "time": time.time() - start,
+                      "checked": len(results),
+                      "violations": [result for result in results if result["violation"] > args.tolerance]}]
+
+    for summary in summaries:
+        for result in summary["violations"]:
+            print("{}: cell {} {} protection level violated by {} (the attacker reaches {}, {} is required)".format(
+                summary["file_name"], result["cell"], result["direction"], result["violation"], result["optimum"],
+                result["required"]))
+        print("{}: {} violations in {} protection levels, {:.2f} seconds".format(
+            summary["file_name"], len(summary["violations"]), summary["checked"], summary["time"]))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+    return summaries
+
+
+if __name__ == "__main__":
+    """This is what will be run when this script is executed, e.g., when python audit.py table.csp output.csv is called from
+    the commandline. The exit status is 1 if any protection level is violated"""
+
+    summaries = run(arguments())
+    sys.exit(1 if any(summary["violations"] for summary in summaries) else 0)
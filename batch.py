@@ -0,0 +1,196 @@
+from multiprocessing import Pool, Event, TimeoutError, active_children, cpu_count
+from gurobipy import *
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+import read
+
+# Set once the batch is interrupted, after which the worker processes skip the tables they have not started
+stopping = None
+
+
+def initialise_worker(stop_event):
+    """Imports the solver and starts the Gurobi environment of a worker process once, so that they are reused by every table
+    the worker protects"""
+
+    global stopping
+    stopping = stop_event
+    import suppress
+    Model("warm")
+
+
+def protect(job):
+    """Protects a single table in a worker process. The output of the solver is written to a log file next to the output of
+    the table.
+
+    :param job: a tuple of the file name of the table and the arguments for the solver
+    :return: a dictionary with the file name, status, time and the results of the solver
+    """
+
+    import suppress
+    file_name, args = job
+    summary = {"file_name": file_name}
+    if stopping is not None and stopping.is_set():
+        summary["status"] = "skipped"
+        summary["time"] = 0
+        return summary
+
+    start = time.time()
+    stdout = sys.stdout
+    log = open(os.path.splitext(args.output)[0] + ".log", "w") if args.output else open(os.devnull, "w")
+    sys.stdout = log
+    try:
+        summary.update(suppress.run(read.data(file_name), args))
+    except KeyboardInterrupt:
+
+        # The table was interrupted before the solver handled the signal, e.g., while it was being read
+        summary["status"] = "interrupted"
+    except Exception:
+        summary["status"] = "error"
+        summary["error"] = traceback.format_exc()
+    finally:
+        sys.stdout = stdout
+        log.close()
+
+    summary["time"] = time.time() - start
+    return summary
+
+
+def tables(source):
+    """Finds the tables to protect. The source is either a directory, in which case all the .csp files are used, or a
+    manifest file with one path per line, relative to the manifest. The tables are sorted from largest to smallest"""
+
+    if os.path.isdir(source):
+        file_names = [os.path.join(source, name) for name in os.listdir(source) if name.endswith(".csp")]
+    else:
+        with open(source, "r") as f:
+            file_names = [os.path.join(os.path.dirname(source), line.strip()) for line in f.readlines()
+                          if line.strip() and not line.strip().startswith("#")]
+
+    return sorted(file_names, key=os.path.getsize, reverse=True)
+
+
+def arguments():
+    """Reads the arguments that can be given when executing the batch.py file. The solver arguments are the same as for
+    suppress.py. Type python batch.py --help for an explanation of the different parameters
+
+    :return: an argparse object. Arguments are called by args.argument_name
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", type=str, help="give relative path to a directory of .csp files or a manifest file with "
+                                                 "one path per line")
+
+    parser.add_argument("--output_dir", type=str, default="", help="the directory where the output and log of every table "
+                                                                   "is stored. Nothing is stored if it is not given")
+
+    parser.add_argument("--summary", type=str, default="summary.json", help="the file where the JSON summary of every table "
+                                                                            "is stored")
+
+    parser.add_argument("--cores", type=int, default=cpu_count(), help="the total number of cores used by all the tables. "
+                                                                       "Each table uses --threads cores (at least one)")
+
+    read.add_solver_arguments(parser)
+    return parser.parse_args()
+
+
+def run(args):
+    """Protects all the tables in a pool of worker processes and writes the summary
+
+    :param args: returned from arguments()
+    :return: a list with the summary of every table
+    """
+
+    # Every table gets its own arguments with an output file in the output directory, and a trace if required, which is
+    # stored next to the table if there is no output directory. Per cell output is not printed, every table uses at least
+    # one thread, and the worker processes cannot start pipeline or attacker worker processes of their own
+    extension = {"jsonl": ".jsonl", "columnar": ".col"}.get(args.format, ".csv")
+    jobs = []
+    for file_name in tables(args.source):
+        table_args = argparse.Namespace(**vars(args))
+        table_args.quiet = True
+        table_args.threads = max(1, args.threads)
+        table_args.pipeline_workers = 0
+        table_args.remote_local = 0
+        table_args.file_name = file_name
+        table_args.output = os.path.join(args.output_dir, os.path.splitext(os.path.basename(file_name))[0] + extension) \
+            if args.output_dir else ""
+        table_args.trace = os.path.join(args.output_dir or os.path.dirname(file_name),
+                                        os.path.splitext(os.path.basename(file_name))[0] + ".trace.gz") if args.trace else ""
+        jobs.append((file_name, table_args))
+
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    # The number of worker processes is chosen so that the total number of cores is not exceeded. The largest tables are
+    # submitted first
+    processes = max(1, args.cores // max(1, args.threads))
+    print("Protecting {} tables with {} worker processes".format(len(jobs), processes))
+    stop_event = Event()
+    pool = Pool(min(processes, max(1, len(jobs))), initialise_worker, (stop_event,))
+
+    # The first SIGINT or SIGTERM stops the batch gracefully: the tables that have not started are skipped and the tables
+    # that are being protected write their best solution so far, as their solvers are interrupted too. A second signal
+    # terminates the worker processes. The summary is written after every table, so it is never lost
+    previous_handler = signal.signal(signal.SIGTERM, terminate)
+    results = pool.imap_unordered(protect, jobs)
+    summaries = []
+    try:
+        while len(summaries) < len(jobs):
+            try:
+
+                # Waiting with a timeout lets the signals through to this process
+                summary = results.next(1)
+            except TimeoutError:
+                continue
+            except KeyboardInterrupt:
+                if stop_event.is_set():
+                    raise
+                print("Interrupted, skipping the remaining tables. Interrupt again to stop the tables being protected")
+                stop_event.set()
+                continue
+
+            print("{}: {} in {:.1f} seconds".format(summary["file_name"], summary["status"], summary["time"]))
+            summaries.append(summary)
+            write_summary(args.summary, summaries)
+        pool.close()
+    except KeyboardInterrupt:
+
+        # The solvers handle SIGTERM themselves, so the worker processes are killed before the pool is terminated
+        print("Stopping the worker processes")
+        for child in active_children():
+            os.kill(child.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+        pool.terminate()
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        write_summary(args.summary, summaries)
+    pool.join()
+
+    return summaries
+
+
+def terminate(signum, frame):
+    """Handles SIGTERM in the main process like a SIGINT. Unlike a SIGINT from the terminal, SIGTERM only reaches this
+    process, so it is passed on to the worker processes as a SIGINT to interrupt their solvers"""
+
+    for child in active_children():
+        os.kill(child.pid, signal.SIGINT)
+    raise KeyboardInterrupt
+
+
+def write_summary(summary_file, summaries):
+    """Writes the summaries of the tables that have finished"""
+
+    with open(summary_file, "w") as f:
+        json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    """This is what will be run when this script is executed, e.g., when python batch.py tables/ is called from the
+    commandline """
+
+    run(arguments())
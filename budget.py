@@ -0,0 +1,129 @@
+from gurobipy import *
+import signal
+import time
+
+
+class Budget:
+    """A single wall-clock budget shared by all the phases of the solver, i.e., diving, redundancy removal, optimising and
+    writing. The time limit of every phase is capped by the time that remains, and a fraction of the budget is kept in
+    reserve for writing the solution.
+
+    The budget also handles SIGINT and SIGTERM. The first signal marks the budget as expired so that the solver stops at the
+    next opportunity and the best solution found so far is written. A second SIGINT stops the program straight away.
+    """
+
+    def __init__(self, deadline=0, reserve=0.1):
+
+        # A deadline of 0 means there is no time limit
+        self.start = time.time()
+        self.deadline = deadline
+        self.reserve = reserve * deadline
+        self.interrupted = False
+        self.previous_handlers = {}
+
+        # Whether the budget stopped a phase before it finished, as opposed to running out after all the phases finished
+        self.cut_short = False
+
+    def remaining(self):
+        """The number of seconds that remain before the reserve for writing is reached"""
+
+        if not self.deadline:
+            return float("inf")
+        return max(self.deadline - self.reserve - (time.time() - self.start), 0)
+
+    def limit(self, phase_limit):
+        """Caps the time limit of a phase by the time that remains"""
+
+        return min(phase_limit, self.remaining())
+
+    def expired(self):
+        """Checks whether the solver should stop, either because the time is up or because a signal was received"""
+
+        return self.interrupted or self.remaining() <= 0
+
+    def should_stop(self):
+        """Checks whether the current phase should stop because the budget has expired, and records that a phase was cut
+        short if so"""
+
+        if self.expired():
+            self.cut_short = True
+            return True
+        return False
+
+    def status(self, found):
+        """Describes how the solver finished: interrupted if a signal stopped it, expired if the budget cut a phase short,
+        and otherwise found or not found depending on whether a suppression pattern was found together with its bounds"""
+
+        if self.interrupted:
+            return "interrupted"
+        if self.cut_short:
+            return "expired"
+        return "found" if found else "not found"
+
+    def check_model(self, model):
+        """Gurobi handles SIGINT itself while it is solving a model, in which case the status of the model records the
+        interruption. The pipeline and the callback of the complete solve also stop the model on purpose, once enough
+        violations are found or the budget expires, which gives the same status. This is only treated as an interruption if
+        neither of them stopped the model. A solve that hits a time limit capped by the budget is recorded as cut short"""
+
+        if model.status == GRB.INTERRUPTED and not getattr(model, "_pipeline_stop", False) and \
+                not getattr(model, "_budget_stop", False):
+            self.interrupted = True
+
+        # A time limit that was capped by the budget also cuts the solve short
+        if model.status == GRB.TIME_LIMIT and self.remaining() <= 0:
+            self.cut_short = True
+
+    def interrupt(self, signum, frame):
+        """The signal handler"""
+
+        if self.interrupted and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        self.interrupted = True
+        print("Interrupted, the best solution found so far will be written")
+
+    def handle_signals(self):
+        """Installs the signal handler for SIGINT and SIGTERM"""
+
+        for signum in (signal.SIGINT, getattr(signal, "SIGTERM", None)):
+            if signum is not None:
+                self.previous_handlers[signum] = signal.signal(signum, self.interrupt)
+
+    def restore_signals(self):
+        """Restores the signal handlers that were installed before handle_signals"""
+
+        for signum, handler in self.previous_handlers.items():
+            signal.signal(signum, handler)
+        self.previous_handlers = {}
+
+
+class Incumbent:
+    """The best feasible suppression pattern found so far, together with its objective and bounds. The bounds are None if
+    they have not been computed"""
+
+    def __init__(self, supp_levels, objective, bounds=None):
+        self.supp_levels = supp_levels
+        self.objective = objective
+        self.bounds = bounds
+
+    def update(self, supp_levels, objective, bounds=None):
+        """Replaces the incumbent if the new suppression pattern has a lower objective, or the same objective and bounds
+        when the incumbent has none"""
+
+        if objective < self.objective or (objective == self.objective and bounds is not None and self.bounds is None):
+            self.supp_levels = dict(supp_levels)
+            self.objective = objective
+            self.bounds = bounds
+            return True
+        return False
+
+
+def trivial_bounds(data, supp_levels):
+    """The bounds of a suppression pattern if no attacker problems are solved, i.e., the full range of every suppressed cell.
+    These are wider than the bounds an attacker can infer, so publishing them is always safe"""
+
+    bounds = {}
+    for cell, info in data["cells"].items():
+        bounds[cell] = (info["nominal"] - info["LB"], info["nominal"] + info["UB"]) if supp_levels[cell] > 0.5 else \
+            (info["nominal"], info["nominal"])
+    return bounds
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+
+class AttackerCache:
+    """A bounded cache of attacker results. The attacker problem of a sensitive cell only depends on the suppression pattern
+    within the component of that cell, so the results are keyed by (sensitive cell, maximise, suppressed cells of the
+    component). Many of the incumbents found during the complete solve share large parts of their suppression pattern, and
+    repeated patterns return the stored optimum and constraints without solving an LP.
+
+    When the cache is full the least recently used result is evicted.
+    """
+
+    def __init__(self, max_size):
+
+        # The results are stored in the order they were last used
+        self.max_size = max_size
+        self.results = OrderedDict()
+
+        # Counters to see how effective the cache is
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the result stored for the key, or None if there is no result"""
+
+        if key not in self.results:
+            self.misses += 1
+            return None
+
+        # Move the result to the end so that it is the most recently used
+        result = self.results.pop(key)
+        self.results[key] = result
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Stores the result for the key and evicts the least recently used result if the cache is full"""
+
+        # A result that is stored again becomes the most recently used
+        self.results.pop(key, None)
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def discard(self, is_invalid):
+        """Removes the results whose key is no longer valid, e.g., after the data of the table has changed"""
+
+        for key in [key for key in self.results.keys() if is_invalid(key)]:
+            del self.results[key]
+
+    def print_stats(self):
+        """Prints the number of hits and misses"""
+
+        print("Cache: {} hits, {} misses, {} stored".format(self.hits, self.misses, len(self.results)))
@@ -0,0 +1,27 @@
+def connected_components(cells, groups):
+    """Finds the connected components of a set of cells, where two cells are connected if they are in the same group, e.g.,
+    share a relation. Cells of a group that are not in the set are left out.
+
+    :param cells: the cells to group into components
+    :param groups: an iterable of lists of cells
+    :return: a dictionary from each cell to its component, and a dictionary from each component to its cells
+    """
+
+    # Each cell starts in its own component and the components are merged group by group
+    component_of = {cell: cell for cell in cells}
+    components = {cell: [cell] for cell in component_of.keys()}
+    for group in groups:
+        members = [cell for cell in group if cell in component_of]
+        for cell in members[1:]:
+            first, second = component_of[members[0]], component_of[cell]
+            if first == second:
+                continue
+
+            # Always move the cells of the smaller component into the larger one
+            if len(components[first]) < len(components[second]):
+                first, second = second, first
+            for moved in components[second]:
+                component_of[moved] = first
+            components[first] += components.pop(second)
+
+    return component_of, components
@@ -1,44 +1,123 @@
+from multiprocessing.pool import ThreadPool
+from components import connected_components
 from gurobipy import *
+import threading
 
+# Gurobi environments are not thread safe so each thread that solves components builds its own environment
+thread_data = threading.local()
 
-def find_most_central_consistent_solution(data, bounds):
+
+def find_most_central_consistent_solution(data, bounds, threads=1):
     """Determines a consistent set of values for the cells within certain bounds that minimises the distance from the centre of
     the bounds, weighted strongly towards secondary suppression.
 
     bounds is a dictionary whose keys are cells and values are tuples where the values are the lower and upper inference
-    bounds"""
-    
-    # Create an LP model and turns off the output flag
-    model = Model("consistent")
-    model.setParam('OutputFlag', False)
-    
+    bounds
+
+    Cells whose bounds are equal, e.g., published cells, are fixed to that value so only the remaining cells are variables.
+    Relations can then only link these cells through each other, so the LP decomposes into components that are solved
+    separately. If threads is more than one the components are solved in parallel."""
+
     # A is the centre of the bound and B is the gap from the centre to the limits.
     A = {cell: (bound[0]+bound[1])/2 for cell, bound in bounds.items()}
     B = {cell: (bound[1]-bound[0])/2 for cell, bound in bounds.items()}
 
+    # The fixed cells are stored straight away. The remaining cells are overwritten once their component is solved
+    for cell, info in data["cells"].items():
+        info["new_nominal"] = A[cell]
+        info["new_diff"] = B[cell]
+
+    components = find_free_components(data, B)
+    if threads > 1 and len(components) > 1:
+
+        # Every thread of the pool builds its own environment when it starts. They are disposed once the pool has finished,
+        # as each environment holds a license token
+        environments = []
+        pool = ThreadPool(threads, create_environment, (environments,))
+        try:
+            solutions = pool.map(lambda component: solve_component(data, A, B, component[0], component[1], True),
+                                 components)
+            pool.close()
+        except Exception:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            for env in environments:
+                env.dispose()
+    else:
+        solutions = [solve_component(data, A, B, cells, relations, False) for cells, relations in components]
+
+    # Store the solution as new attributes in the data.
+    for solution in solutions:
+        for cell, (z_max, z_min) in solution.items():
+            data["cells"][cell]["new_nominal"] = A[cell] + z_max - z_min
+            data["cells"][cell]["new_diff"] = B[cell] + max(z_max, z_min)
+
+
+def find_free_components(data, B):
+    """Groups the cells that are not fixed, i.e., have a gap B greater than zero, into components that are linked by the
+    relations. Relations that only contain fixed cells are left out.
+
+    :return: a list of (cells, relations) for each component
+    """
+
+    component_of, components = connected_components([cell for cell in data["cells"].keys() if B[cell] > 0],
+                                                     (lhs + rhs for lhs, rhs in data["relations"].values()))
+
+    # Each relation with a free cell belongs to the component of its free cells
+    relations = {component: [] for component in components.keys()}
+    for relation, (lhs, rhs) in data["relations"].items():
+        free_cells = [cell for cell in lhs + rhs if cell in component_of]
+        if free_cells:
+            relations[component_of[free_cells[0]]].append(relation)
+
+    return [(cells, relations[component]) for component, cells in components.items()]
+
+
+def create_environment(environments):
+    """Builds the environment of a thread of the pool. The environments are collected so that they can be disposed"""
+
+    thread_data.env = Env()
+    environments.append(thread_data.env)
+
+
+def solve_component(data, A, B, cells, relations, own_environment):
+    """Solves the consistent LP for a single component. The fixed cells of a relation are moved to the right hand side.
+
+    :return: a dictionary from each cell of the component to the values of (z_max, z_min)
+    """
+
+    # Create an LP model and turns off the output flag
+    if own_environment:
+        model = Model("consistent", env=thread_data.env)
+    else:
+        model = Model("consistent")
+    model.setParam('OutputFlag', False)
+
     # Define variables
-    z_min_vars = {cell: model.addVar(vtype=GRB.CONTINUOUS,
-                                     lb=0,
-                                     ub=B[cell] - 1 if A[cell] - B[cell] == 0 and B[cell] > 0 else B[cell],
-                                     obj=1 if info['sensitive'] else 100) for cell, info in data["cells"].items()}
-
-    z_max_vars = {cell: model.addVar(vtype=GRB.CONTINUOUS,
-                                     lb=0,
-                                     ub=B[cell],
-                                     obj=1 if info['sensitive'] else 100) for cell, info in data["cells"].items()}
-
-    # Define constraints
-    for relation, (lhs, rhs) in data['relations'].items():
-        model.addConstr(
-            quicksum(A[cell] + z_max_vars[cell] - z_min_vars[cell] for cell in lhs) ==
-            quicksum(A[cell] + z_max_vars[cell] - z_min_vars[cell] for cell in rhs)
-        )
+    weights = [1 if data["cells"][cell]['sensitive'] else 100 for cell in cells]
+    z_min_vars = model.addVars(cells, lb=0,
+                               ub=[B[cell] - 1 if A[cell] - B[cell] == 0 and B[cell] > 0 else B[cell] for cell in cells],
+                               obj=weights)
+    z_max_vars = model.addVars(cells, lb=0, ub=[B[cell] for cell in cells], obj=weights)
+
+    # Define constraints. The lhs minus the rhs of each relation must be zero
+    for relation in relations:
+        lhs, rhs = data['relations'][relation]
+        coefficients, variables, constant = [], [], 0
+        for sign, relation_cells in ((1, lhs), (-1, rhs)):
+            for cell in relation_cells:
+                constant += sign * A[cell]
+                if cell in z_max_vars:
+                    coefficients += [sign, -sign]
+                    variables += [z_max_vars[cell], z_min_vars[cell]]
+        model.addConstr(LinExpr(coefficients, variables) == -constant)
 
     # Solve the model
     model.optimize()
+    solution = {cell: (z_max_vars[cell].x, z_min_vars[cell].x) for cell in cells}
 
-    # Store the solution as new attributes in the data.
-    for cell, info in data["cells"].items():
-        new_nominal = A[cell] + z_max_vars[cell].x - z_min_vars[cell].x
-        data["cells"][cell]["new_nominal"] = new_nominal
-        data["cells"][cell]["new_diff"] = B[cell] + max(z_max_vars[cell].x, z_min_vars[cell].x)
+    # The model is freed straight away so that its environment can be disposed
+    model.dispose()
+    return solution
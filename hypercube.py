@@ -0,0 +1,190 @@
+import numpy as np
+
+
+class TableStructure:
+    """The structure of the table derived from the relations, stored as NumPy arrays. Each relation is a list of cells with
+    a sign of 1 (left hand side) or -1 (right hand side), and each cell has the list of relations it is in. Both are stored
+    in compressed form, i.e., the entries of relation r are those from start[r] to start[r + 1]"""
+
+    def __init__(self, data):
+
+        self.cells = list(data["cells"].keys())
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+        self.relations = list(data["relations"].keys())
+
+        # The entries of each relation
+        relation_of, cell_of, sign_of = [], [], []
+        for r, relation in enumerate(self.relations):
+            lhs, rhs = data["relations"][relation]
+            for sign, cells in ((1, lhs), (-1, rhs)):
+                for cell in cells:
+                    relation_of.append(r)
+                    cell_of.append(self.index[cell])
+                    sign_of.append(sign)
+        relation_of = np.array(relation_of, dtype=np.int64)
+        cell_of = np.array(cell_of, dtype=np.int64)
+        sign_of = np.array(sign_of, dtype=np.int64)
+
+        self.relation_start = np.concatenate(([0], np.cumsum(np.bincount(relation_of, minlength=len(self.relations)))))
+        self.relation_cells = cell_of
+        self.relation_signs = sign_of
+
+        # The same entries sorted by cell
+        order = np.argsort(cell_of, kind="mergesort")
+        self.cell_start = np.concatenate(([0], np.cumsum(np.bincount(cell_of, minlength=len(self.cells)))))
+        self.cell_relations = relation_of[order]
+        self.cell_signs = sign_of[order]
+        self.relation_size = np.diff(self.relation_start)
+
+        # The cost and the room to move of every cell. Cells with a zero nominal cannot be suppressed
+        self.weight = np.array([data["cells"][cell].get("weight", 1) for cell in self.cells], dtype=float)
+        self.UB = np.array([data["cells"][cell]["UB"] for cell in self.cells], dtype=float)
+        self.LB = np.array([data["cells"][cell]["LB"] for cell in self.cells], dtype=float)
+        self.suppressible = np.array([data["cells"][cell]["nominal"] != 0 for cell in self.cells])
+
+        # A lower estimate of the cost of balancing a relation, used to rank partial hypercubes
+        weights = self.weight[self.suppressible & (self.weight > 0)]
+        self.min_weight = weights.min() if len(weights) else 0
+
+    def relations_of(self, i):
+        return self.cell_relations[self.cell_start[i]:self.cell_start[i + 1]], \
+            self.cell_signs[self.cell_start[i]:self.cell_start[i + 1]]
+
+    def cells_of(self, r):
+        return self.relation_cells[self.relation_start[r]:self.relation_start[r + 1]], \
+            self.relation_signs[self.relation_start[r]:self.relation_start[r + 1]]
+
+
+def find_hypercube(structure, i, UPL, LPL, suppressed, beam=8, max_size=64):
+    """Finds a cheap hypercube that protects a sensitive cell. A hypercube is a set of cells with a direction for each cell,
+    such that moving every cell of the set in its direction by the same amount keeps all the relations satisfied. In an
+    n-dimensional table these are the 2^n corners of a hypercube, but they are found here directly from the relations, so
+    tables with hierarchies or irregular relations are handled too.
+
+    The hypercube is grown from the sensitive cell with a beam search. In each step, an unbalanced relation of every partial
+    hypercube is balanced by adding one of its cells, and the beam partial hypercubes with the lowest cost plus an estimate
+    of the cost of balancing their remaining relations are kept. The candidates of all the partial hypercubes are scored
+    together on NumPy arrays, and only the kept ones are built. Cells that are already suppressed cost nothing, so
+    hypercubes of different sensitive cells share cells where possible. A cell can only be added if it can move far enough
+    for both protection levels.
+
+    :param structure: a TableStructure
+    :param i: the index of the sensitive cell
+    :param suppressed: a boolean array of the cells that are already suppressed
+    :return: an array with the indices of the cells of the hypercube, or None if none is found
+    """
+
+    if structure.UB[i] < UPL or structure.LB[i] < LPL:
+        return None
+
+    # Each partial hypercube is (cost, {cell: direction}, relations, imbalances), where the unbalanced relations are a sorted
+    # array and the imbalances the array of their imbalance
+    relations, signs = structure.relations_of(i)
+    states = [(0.0, {i: 1}) + merge_imbalance(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), relations, signs)]
+    for _ in range(max_size):
+        for cost, support, keys, values in states:
+            if not len(keys):
+                return np.array(list(support.keys()))
+
+        # Expand every partial hypercube by each cell of its unbalanced relation with the fewest cells, which is the one with
+        # the fewest choices. The relations are sorted, so ties go to the first relation
+        candidates = []
+        for s, (cost, support, keys, values) in enumerate(states):
+            k = np.argmin(structure.relation_size[keys])
+            cells, cell_signs = structure.cells_of(keys[k])
+            directions = -values[k] * cell_signs
+            up = np.where(directions > 0, structure.UB[cells], structure.LB[cells])
+            down = np.where(directions > 0, structure.LB[cells], structure.UB[cells])
+            size = np.abs(directions)
+            feasible = structure.suppressible[cells] & (up >= UPL * size) & (down >= LPL * size) & \
+                ~np.isin(cells, list(support.keys()))
+            cells, directions = cells[feasible], directions[feasible]
+            if not len(cells):
+                continue
+            new_cost = cost + np.where(suppressed[cells], 0, structure.weight[cells])
+
+            # The relations of every candidate cell, gathered from the compressed arrays
+            counts = structure.cell_start[cells + 1] - structure.cell_start[cells]
+            owner = np.repeat(np.arange(len(cells)), counts)
+            entries = np.repeat(structure.cell_start[cells] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            candidate_relations = structure.cell_relations[entries]
+            change = structure.cell_signs[entries] * directions[owner]
+
+            # The number of unbalanced relations after adding each candidate. A relation becomes balanced if its imbalance
+            # is cancelled, and unbalanced if it was balanced before
+            position = np.minimum(np.searchsorted(keys, candidate_relations), max(len(keys) - 1, 0))
+            present = (keys[position] == candidate_relations) if len(keys) else np.zeros(len(entries), dtype=bool)
+            unbalanced_after = np.where(present, values[position], 0) + change != 0
+            unbalanced = len(keys) + np.bincount(owner, weights=unbalanced_after.astype(int) - present.astype(int),
+                                                 minlength=len(cells)).astype(np.int64)
+
+            # Every unbalanced relation needs at least one more cell
+            candidates.append((new_cost + unbalanced * structure.min_weight, unbalanced, new_cost,
+                               np.full(len(cells), s, dtype=np.int64), cells, directions))
+
+        if not candidates:
+            return None
+
+        # Keep the cheapest distinct partial hypercubes
+        score, unbalanced, new_cost, state, cells, directions = [np.concatenate(column) for column in zip(*candidates)]
+        new_states, seen = [], set()
+        for c in np.lexsort((unbalanced, score)):
+            cost, support, keys, values = states[state[c]]
+            support = dict(support)
+            support[cells[c]] = directions[c]
+            key = frozenset(support.items())
+            if key in seen:
+                continue
+            seen.add(key)
+
+            relations, signs = structure.relations_of(cells[c])
+            new_states.append((new_cost[c], support) + merge_imbalance(keys, values, relations, signs * directions[c]))
+            if len(new_states) >= beam:
+                break
+
+        states = sorted(new_states, key=lambda x: x[0])
+
+    return None
+
+
+def merge_imbalance(keys, values, relations, change):
+    """Adds a change to the imbalances of a set of relations, and returns the sorted relations that remain unbalanced with
+    their imbalances"""
+
+    keys, inverse = np.unique(np.concatenate((keys, relations)), return_inverse=True)
+    values = np.bincount(inverse, weights=np.concatenate((values, change))).astype(np.int64)
+    return keys[values != 0], values[values != 0]
+
+
+def protect(data, beam=8, budget=None):
+    """Protects the sensitive cells one at a time, from the largest protection level to the smallest, by suppressing the
+    cells of a cheap hypercube for each.
+
+    :param data: returned from read.data(filename)
+    :param beam: the number of partial hypercubes kept in each step of the search
+    :param budget: an optional Budget. The search stops early if it expires
+    :return: the suppression pattern and a list of the sensitive cells without a hypercube
+    """
+
+    structure = TableStructure(data)
+    suppressed = np.zeros(len(structure.cells), dtype=bool)
+    for cell in data["sensitive cells"].keys():
+        suppressed[structure.index[cell]] = True
+
+    unprotected = []
+    for cell in sorted(data["sensitive cells"].keys(), reverse=True,
+                       key=lambda x: max(data["sensitive cells"][x]["UPL"], data["sensitive cells"][x]["LPL"])):
+        if budget and budget.should_stop():
+            unprotected.append(cell)
+            continue
+        if data["sensitive cells"][cell]["UPL"] <= 0 and data["sensitive cells"][cell]["LPL"] <= 0:
+            continue
+
+        cube = find_hypercube(structure, structure.index[cell], data["sensitive cells"][cell]["UPL"],
+                              data["sensitive cells"][cell]["LPL"], suppressed, beam)
+        if cube is None:
+            unprotected.append(cell)
+        else:
+            suppressed[cube] = True
+
+    return {cell: 1 if suppressed[i] else 0 for i, cell in enumerate(structure.cells)}, unprotected
@@ -15,6 +15,12 @@ class Master:
         self.mdl = Model("master")
         self.vars = self.create_vars()
 
+        # The initial constraints of each relation and the constraints found by the sub-problem are tracked so that they can
+        # be removed if the data changes. The latter are stored as (sensitive cell, coefficients, constraint)
+        self.ignore_starting_constraints = ignore_starting_constraints
+        self.relation_constraints = {}
+        self.cuts = []
+
         # Adds the initial constraints unless specified otherwise
         if not ignore_starting_constraints:
             self.create_initial_constraints()
@@ -37,63 +43,117 @@ class Master:
         primary suppression provides at least enough protection for those cells. The second ensures that a relation cannot have
         exactly one suppressed cell"""
 
-        # Iterate over each relation, collect all the cells into a list, and check how many sensitive cells there are
-        for relation, cells in self.data['relations'].items():
-            all_cells = cells[0] + cells[1]
-            num_sensitive_cells = sum(self.data["cells"][cell]["sensitive"] for cell in all_cells)
-
-            # Then iterate over all the cells in the relation and check if they are sensitive
+        for relation in self.data['relations'].keys():
+            self.relation_constraints[relation] = self.create_relation_constraints(relation)
+
+    def create_relation_constraints(self, relation):
+        """Creates the initial constraints of a single relation and returns them as a list"""
+
+        constraints = []
+
+        # Collect all the cells of the relation into a list, and check how many sensitive cells there are
+        cells = self.data['relations'][relation]
+        all_cells = cells[0] + cells[1]
+        num_sensitive_cells = sum(self.data["cells"][cell]["sensitive"] for cell in all_cells)
+
+        # Then iterate over all the cells in the relation and check if they are sensitive
+        for cell in all_cells:
+            if self.data["cells"][cell]["sensitive"]:
+
+                # Check if protected by primary suppression
+                Q_plus = cells[1] if cell in cells[0] else cells[0]
+                Q_minus = cells[0] if cell in cells[0] else cells[1]
+                UPL = self.data["sensitive cells"][cell]["UPL"]
+                LPL = self.data["sensitive cells"][cell]["LPL"]
+
+                # Check if the Upper Protection Level is violated
+                if sum(self.data["cells"][cell_name]['UB'] for cell_name in Q_plus
+                       if self.data["cells"][cell_name]["sensitive"] and cell != cell_name) + \
+                        sum(self.data["cells"][cell_name]['LB'] for cell_name in Q_minus if
+                            self.data["cells"][cell_name]["sensitive"] and cell != cell_name) < UPL:
+
+                    # If so add a constraint to ensure it is protected
+                    constraints.append(self.mdl.addConstr(
+                        quicksum(
+                            min(self.data["cells"][cell_name]["UB"], UPL) * self.vars[cell_name] for cell_name in Q_plus if
+                            cell_name !=
+                            cell) +
+                        quicksum(
+                            min(self.data["cells"][cell_name]["LB"], UPL) * self.vars[cell_name] for cell_name in Q_minus if
+                            cell_name
+                            != cell) >= UPL, name="init_upper_{}".format(relation)
+                    ))
+
+                # Check if the Lower Protection Level is violated
+                if sum(self.data["cells"][cell_name]['UB'] for cell_name in Q_minus
+                       if self.data["cells"][cell_name]["sensitive"] and cell != cell_name) + \
+                        sum(self.data["cells"][cell_name]['LB'] for cell_name in Q_plus if
+                            self.data["cells"][cell_name]["sensitive"] and cell != cell_name) < LPL:
+
+                    # If so add a constraint to ensure it is protected
+                    constraints.append(self.mdl.addConstr(
+                        quicksum(min(self.data["cells"][cell_name]["UB"], LPL)*self.vars[cell_name]
+                                 for cell_name in Q_minus if cell_name != cell) +
+                        quicksum(
+                            min(self.data["cells"][cell_name]["LB"], LPL) * self.vars[cell_name] for cell_name in Q_plus if
+                            cell_name
+                            != cell) >= LPL, name="init_lower{}".format(relation)
+                    ))
+
+        # Bridgeless constraints are only relevant if the relation has less than 2 primary suppressions
+        if num_sensitive_cells < 2:
             for cell in all_cells:
-                if self.data["cells"][cell]["sensitive"]:
-
-                    # Check if protected by primary suppression
-                    Q_plus = cells[1] if cell in cells[0] else cells[0]
-                    Q_minus = cells[0] if cell in cells[0] else cells[1]
-                    UPL = self.data["sensitive cells"][cell]["UPL"]
-                    LPL = self.data["sensitive cells"][cell]["LPL"]
-
-                    # Check if the Upper Protection Level is violated
-                    if sum(self.data["cells"][cell_name]['UB'] for cell_name in Q_plus
-                           if self.data["cells"][cell_name]["sensitive"] and cell != cell_name) + \
-                            sum(self.data["cells"][cell_name]['LB'] for cell_name in Q_minus if
-                                self.data["cells"][cell_name]["sensitive"] and cell != cell_name) < UPL:
-
-                        # If so add a constraint to ensure it is protected
-                        self.mdl.addConstr(
-                            quicksum(
-                                min(self.data["cells"][cell_name]["UB"], UPL) * self.vars[cell_name] for cell_name in Q_plus if
-                                cell_name !=
-                                cell) +
-                            quicksum(
-                                min(self.data["cells"][cell_name]["LB"], UPL) * self.vars[cell_name] for cell_name in Q_minus if
-                                cell_name
-                                != cell) >= UPL, name="init_upper_{}".format(relation)
-                        )
-
-                    # Check if the Lower Protection Level is violated
-                    if sum(self.data["cells"][cell_name]['UB'] for cell_name in Q_minus
-                           if self.data["cells"][cell_name]["sensitive"] and cell != cell_name) + \
-                            sum(self.data["cells"][cell_name]['LB'] for cell_name in Q_plus if
-                                self.data["cells"][cell_name]["sensitive"] and cell != cell_name) < LPL:
-
-                        # If so add a constraint to ensure it is protected
-                        self.mdl.addConstr(
-                            quicksum(min(self.data["cells"][cell_name]["UB"], LPL)*self.vars[cell_name]
-                                     for cell_name in Q_minus if cell_name != cell) +
-                            quicksum(
-                                min(self.data["cells"][cell_name]["LB"], LPL) * self.vars[cell_name] for cell_name in Q_plus if
-                                cell_name
-                                != cell) >= LPL, name="init_lower{}".format(relation)
-                        )
-
-            # Bridgeless constraints are only relevant if the relation has less than 2 primary suppressions
-            if num_sensitive_cells < 2:
-                for cell in all_cells:
-
-                    # If one cell is suppressed then so to must another
-                    self.mdl.addConstr(quicksum(self.vars[cell_name] for cell_name in all_cells if cell_name != cell and
-                                                self.data["cells"][cell_name]["nominal"] > 0
-                                                ) >= self.vars[cell], name="init_bridge_{}_{}".format(relation, cell))
+
+                # If one cell is suppressed then so to must another
+                constraints.append(self.mdl.addConstr(
+                    quicksum(self.vars[cell_name] for cell_name in all_cells if cell_name != cell and
+                             self.data["cells"][cell_name]["nominal"] > 0
+                             ) >= self.vars[cell], name="init_bridge_{}_{}".format(relation, cell)))
+
+        return constraints
+
+    def add_cut(self, sensitive_cell, maximise, coefficients, rhs):
+        """Adds a constraint found by the sub-problem to the model permanently and keeps track of it"""
+
+        constraint = self.mdl.addConstr(
+            LinExpr((value, self.vars[cell]) for cell, value in coefficients.items()) >= rhs,
+            name="lazy_{}_{}".format("upper" if maximise else "lower", sensitive_cell)
+        )
+        self.cuts.append((sensitive_cell, coefficients, constraint))
+
+    def remove_cuts(self, is_invalid):
+        """Removes the constraints found by the sub-problem for which is_invalid(sensitive cell, coefficients) is True.
+        Returns the number of constraints removed"""
+
+        kept = []
+        for sensitive_cell, coefficients, constraint in self.cuts:
+            if is_invalid(sensitive_cell, coefficients):
+                self.mdl.remove(constraint)
+            else:
+                kept.append((sensitive_cell, coefficients, constraint))
+
+        removed = len(self.cuts) - len(kept)
+        self.cuts = kept
+        return removed
+
+    def update_cells(self, cells):
+        """Updates the variables of a number of cells and rebuilds the initial constraints of their relations after the
+        data of the cells has changed"""
+
+        for cell in cells:
+            info = self.data["cells"][cell]
+            self.vars[cell].setAttr(GRB.Attr.LB, info["sensitive"])
+            self.vars[cell].setAttr(GRB.Attr.Obj, info["weight"] if "weight" in info.keys() else 1)
+
+        if self.ignore_starting_constraints:
+            return
+
+        cells = set(cells)
+        for relation, (lhs, rhs) in self.data["relations"].items():
+            if cells.intersection(lhs) or cells.intersection(rhs):
+                for constraint in self.relation_constraints.pop(relation, []):
+                    self.mdl.remove(constraint)
+                self.relation_constraints[relation] = self.create_relation_constraints(relation)
 
     def provide_feasible_solution(self, supp_levels):
         """Provides the Gurobi Model with a feasible suppression pattern as a initial feasible solution"""
@@ -108,14 +168,31 @@ class Master:
         print("{} number primary".format(len(self.data["sensitive cells"])))
         print("{} number relations".format(len(self.data["relations"])))
 
-    def print_results(self):
-        """Prints the objective, number of primary suppressions, secondary suppressions, and unsuppressed cells """
+    def results(self, supp_levels=None):
+        """Returns a dictionary with the objective, number of primary suppressions, secondary suppressions, and unsuppressed
+        cells. These are for the current solution of the master problem unless a suppression pattern is given"""
+
+        if supp_levels is None:
+            supp_levels = {cell: var.x for cell, var in self.vars.items()}
+            objective = self.mdl.ObjVal
+        else:
+            objective = sum(var.obj * supp_levels[cell] for cell, var in self.vars.items())
 
         num_primary = len(self.data["sensitive cells"])
-        num_secondary = sum(var.x > 0.5 for var in self.vars.values()) - num_primary
+        num_secondary = sum(supp > 0.5 for supp in supp_levels.values()) - num_primary
         num_unsuppressed = len(self.data["cells"]) - num_primary - num_secondary
 
-        print("objective {}".format(self.mdl.ObjVal))
-        print("{} primary suppressions".format(num_primary))
-        print("{} secondary suppressions".format(num_secondary))
-        print("{} unsuppressed cells".format(num_unsuppressed))
+        return {"objective": objective,
+                "primary": num_primary,
+                "secondary": num_secondary,
+                "unsuppressed": num_unsuppressed}
+
+    def print_results(self, supp_levels=None):
+        """Prints the objective, number of primary suppressions, secondary suppressions, and unsuppressed cells. These are
+        for the current solution of the master problem unless a suppression pattern is given"""
+
+        results = self.results(supp_levels)
+        print("objective {}".format(results["objective"]))
+        print("{} primary suppressions".format(results["primary"]))
+        print("{} secondary suppressions".format(results["secondary"]))
+        print("{} unsuppressed cells".format(results["unsuppressed"]))
@@ -0,0 +1,88 @@
+from multiprocessing import Pool
+from subproblem import SubProblem
+from gurobipy import *
+import read
+
+# Each worker process holds a single sub-problem, without a master problem, that is reused for every suppression pattern
+worker_sub_problem = None
+
+
+def initialise_worker(data):
+    """Builds the sub-problem of a worker process. This is called once when the worker process starts"""
+
+    global worker_sub_problem
+    worker_sub_problem = SubProblem(None, data)
+
+
+def check_pattern(supp_levels, max_constraints):
+    """Solves the attacker problems for a suppression pattern in a worker process and returns the constraints found as a list
+    of (sensitive cell, maximise, [(coefficients, rhs), ...])"""
+
+    worker_sub_problem.max_constraints_per_iteration = max_constraints
+    worker_sub_problem.attacker.update_bounds(supp_levels)
+    worker_sub_problem.solve()
+    return worker_sub_problem.found_cuts
+
+
+class AttackerPool:
+    """A pool of worker processes that check the intermediate integer solutions of the master problem while the master
+    problem is still being solved. The pool must be created before any Gurobi model is built so that the worker processes do
+    not inherit the Gurobi environment of the main process.
+    """
+
+    def __init__(self, data, workers, max_constraints=50):
+
+        self.workers = workers
+        self.max_constraints = max_constraints
+        self.pool = Pool(workers, initialise_worker, (read.portable(data),))
+
+        # The results that have been submitted but not yet collected, and the number of violations collected
+        self.pending = []
+        self.violations = 0
+
+    def submit(self, supp_levels):
+        """Submits a suppression pattern to be checked. If all the workers are busy the pattern is dropped, as the newer
+        solutions of the master problem are more useful than the older ones"""
+
+        if len(self.pending) < self.workers:
+            self.pending.append(self.pool.apply_async(check_pattern, (supp_levels, self.max_constraints)))
+
+    def collect(self):
+        """Returns the constraints of all the finished checks"""
+
+        found_cuts = []
+        for result in [result for result in self.pending if result.ready()]:
+            self.pending.remove(result)
+            found_cuts += result.get()
+
+        self.violations += len(found_cuts)
+        return found_cuts
+
+    def close(self):
+        """Stops the worker processes"""
+
+        self.pool.terminate()
+        self.pool.join()
+
+
+def dive_callback(model, where):
+    """The callback function used by the diving heuristic when there is an AttackerPool. Every integer feasible solution is
+    submitted to the pool and the constraints found by the pool are added as lazy constraints. The master problem is stopped
+    once enough violations have been found."""
+
+    if where == GRB.Callback.MIPSOL:
+
+        # Add the constraints that have been found since the last solution. They are also stored so they can be added to
+        # the model permanently, as lazy constraints added in a callback are discarded after the solve
+        for sensitive_cell, maximise, cuts in model._pool.collect():
+            for coefficients, rhs in cuts:
+                model.cbLazy(LinExpr((value, model._vars[cell]) for cell, value in coefficients.items()) >= rhs)
+            model._pipeline_cuts.append((sensitive_cell, maximise, cuts))
+
+        # Stop the master problem if enough violations have been found, otherwise check the new solution
+        if model._pool.violations >= model._pipeline_violations:
+            model._pipeline_stop = True
+            model.terminate()
+        else:
+            supp_levels = {cell: min(max(model.cbGetSolution(var), 0), 1) for cell, var in model._vars.items()}
+            model._pool.submit(supp_levels)
@@ -1,6 +1,11 @@
 from collections import defaultdict
+from array import array
 import re
 import argparse
+import struct
+import json
+import csv
+import sys
 
 
 def data(my_file):
@@ -100,6 +105,15 @@ def data(my_file):
         return my_data
 
 
+def portable(my_data):
+    """Returns a copy of the data that can be pickled, e.g., to send it to another process. The relations are stored in a
+    defaultdict with a lambda as the default factory, which cannot be pickled"""
+
+    copied = dict(my_data)
+    copied["relations"] = dict(my_data["relations"])
+    return copied
+
+
 def files(cell_data, reln_data):
     """ Currently since function isn't used but can be to read the data in the ampl format Chris Mann is using for the
     reconstruction attacks.
@@ -147,9 +161,81 @@ def files(cell_data, reln_data):
             else:
                 raise ValueError("wrong index")
 
+    # Store the same extra info as data(), which the solver relies on
+    data["num_relations"] = len(data["relations"])
+    data["num_nz"] = len([cell for cell, info in data["cells"].items() if info["nominal"] != 0])
+
     return data
 
 
+def pattern(pattern_file, my_data):
+    """Reads a published suppression pattern, e.g., the output of write.solution in any mode and format. Cells that are not
+    in the file are taken to be published.
+
+    :param pattern_file: a csv, jsonl or columnar file with a row per cell
+    :param my_data: the data of the table, used to match the cell ids of the file to those of the table
+    :return: a dictionary from each cell to its suppression level, 1 if suppressed and 0 otherwise
+    """
+
+    # The cell ids in csv files are strings, so they are matched by their string representation
+    cells = {str(cell): cell for cell in my_data["cells"].keys()}
+    supp_levels = {cell: 0 for cell in my_data["cells"].keys()}
+
+    with open(pattern_file, "rb") as f:
+        first_line = f.readline()
+
+    if first_line == b"SUPPCOL1\n":
+        rows = columnar(pattern_file)
+    elif first_line.lstrip().startswith(b"{"):
+        rows = (json.loads(line) for line in open(pattern_file, "r") if line.strip())
+    else:
+        rows = csv.DictReader(open(pattern_file, "r"))
+
+    for row in rows:
+        cell = str(row["cell"]).strip()
+        if cell not in cells:
+            raise ValueError("Cell {} of the pattern is not in the table".format(cell))
+
+        # Mode 0 marks suppressed cells with np (NaN in the columnar format), the other modes have a suppressed column
+        if "publication" in row:
+            publication = row["publication"]
+            suppressed = publication != publication or str(publication).strip() == "np"
+        else:
+            suppressed = str(row["suppressed"]).strip() in ("True", "true", "1", "1.0")
+        supp_levels[cells[cell]] = 1 if suppressed else 0
+
+    return supp_levels
+
+
+def columnar(columnar_file):
+    """Reads the rows of a file in the columnar format written by write.ColumnarWriter"""
+
+    with open(columnar_file, "rb") as f:
+        f.readline()
+        columns = json.loads(f.readline().decode("ascii"))
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            count = struct.unpack("<I", header)[0]
+
+            # Read each column of the block in turn
+            arrays = []
+            for _, code in columns:
+                values = array(str(code))
+                block = f.read(count * values.itemsize)
+                if hasattr(values, "frombytes"):
+                    values.frombytes(block)
+                else:
+                    values.fromstring(block)
+                if sys.byteorder == "big":
+                    values.byteswap()
+                arrays.append(values)
+
+            for i in range(count):
+                yield {name: values[i] for (name, _), values in zip(columns, arrays)}
+
+
 def arguments():
     """Reads the arguments that can be given when executing the suppress.py file. Type python suppress.py --help for an
     explanation of the different parameters
@@ -164,6 +250,33 @@ def arguments():
     parser.add_argument("file_name", type=str, help="give relative path to data file")
 
     # The remaining arguments are optional
+    add_solver_arguments(parser)
+
+    # Reads the arguments
+    args = parser.parse_args()
+
+    # Prints some important parameters so I don't forget what defaults are being used
+    print("Filename: {}".format(args.file_name))
+    print("Time per master solve: {}".format(args.heuristic_time))
+    print("Max constraints added per subsolve iteration: {}".format(args.heuristic_constraints))
+    print("Multiplier: {}".format(args.multiplier))
+    print("Acceptable Gap: {}".format(args.heuristic_gap))
+    print("Optimisation status: {}".format(args.optimise))
+    print("Adaptive order: {}".format(args.adaptive_order))
+    print("Cut strengthening: {}".format(args.strengthen))
+    print("Engine: {}".format(args.engine))
+    if args.optimise:
+        print("Time per master solve: {}".format(args.optimise_time))
+        print("Max constraints added per subsolve iteration: {}".format(args.heuristic_constraints))
+        print("Acceptable Gap: {}".format(args.optimise_gap))
+
+    return args
+
+
+def add_solver_arguments(parser):
+    """Adds the optional arguments that control the solver to an argparse object. These are shared by suppress.py and
+    batch.py"""
+
     parser.add_argument("--heuristic_time", type=int, help="provide a time limit to the master problem in seconds", default=1)
 
     parser.add_argument("--optimise_time", type=int, help="provide a time limit to the master problem in seconds",
@@ -217,19 +330,89 @@ def arguments():
                         help="A flag to ensure that the solver tries to find the optimal solution after an initial feasible "
                              "solution is found. WARNING: this requires lazy constraints ")
 
-    # Reads the arguments
-    args = parser.parse_args()
+    parser.add_argument("--adaptive_order",
+                        type=int,
+                        default=0,
+                        help="A flag to order the attacker problems by recent cuts and protection margin, and to skip those "
+                             "whose component has only gained suppressions since they were last protected")
 
-    # Prints some important parameters so I don't forget what defaults are being used
-    print("Filename: {}".format(args.file_name))
-    print("Time per master solve: {}".format(args.heuristic_time))
-    print("Max constraints added per subsolve iteration: {}".format(args.heuristic_constraints))
-    print("Multiplier: {}".format(args.multiplier))
-    print("Acceptable Gap: {}".format(args.heuristic_gap))
-    print("Optimisation status: {}".format(args.optimise))
-    if args.optimise:
-        print("Time per master solve: {}".format(args.optimise_time))
-        print("Max constraints added per subsolve iteration: {}".format(args.heuristic_constraints))
-        print("Acceptable Gap: {}".format(args.optimise_gap))
+    parser.add_argument("--strengthen",
+                        type=str,
+                        default="",
+                        help="A comma separated list of cut strengthening steps applied to the constraints found by the "
+                             "sub-problem: tighten, alternative, check. Compare the number of iterations with different "
+                             "steps to see the effect of each")
 
-    return args
+    parser.add_argument("--alternative_cuts",
+                        type=int,
+                        default=2,
+                        help="The maximum number of constraints from alternative attacker solutions per violation when the "
+                             "alternative strengthening step is used")
+
+    parser.add_argument("--cache_size",
+                        type=int,
+                        default=0,
+                        help="The maximum number of attacker results stored so that repeated suppression patterns do not "
+                             "need to be solved again. 0 disables the cache")
+
+    parser.add_argument("--pipeline_workers",
+                        type=int,
+                        default=0,
+                        help="The number of worker processes that check the intermediate solutions of the master problem "
+                             "during the diving heuristic. 0 disables the pipeline")
+
+    parser.add_argument("--pipeline_violations",
+                        type=int,
+                        default=50,
+                        help="The master problem is stopped early once the pipeline workers have found this many violated "
+                             "protection levels")
+
+    parser.add_argument("--remote",
+                        type=str,
+                        default="",
+                        help="A comma separated list of host:port of attacker workers started with python remote.py. The "
+                             "attacker problems of every sub-problem iteration are solved on these workers")
+
+    parser.add_argument("--remote_local",
+                        type=int,
+                        default=0,
+                        help="The number of attacker workers to start as processes on this host, in addition to --remote")
+
+    parser.add_argument("--engine",
+                        type=str,
+                        default="dive",
+                        choices=["dive", "hypercube"],
+                        help="The engine that finds the first feasible solution: the diving heuristic, or a hypercube for "
+                             "every sensitive cell, which falls back to the diving heuristic if it is not feasible")
+
+    parser.add_argument("--hypercube_beam",
+                        type=int,
+                        default=8,
+                        help="The number of partial hypercubes kept in each step of the hypercube search")
+
+    parser.add_argument("--trace",
+                        type=str,
+                        default="",
+                        help="A file where every suppression pattern checked by the sub-problem, and the outcome, is "
+                             "recorded so it can be replayed with python replay.py")
+
+    parser.add_argument("--threads",
+                        type=int,
+                        default=0,
+                        help="The number of threads used by Gurobi and to solve the components of the consistent table in "
+                             "mode 2. 0 lets Gurobi choose and solves the components one at a time")
+
+    parser.add_argument("--deadline",
+                        type=float,
+                        default=0,
+                        help="A wall-clock limit in seconds for all the phases together: diving, redundancy removal, "
+                             "optimising and writing. The best solution found within the limit is written. 0 means no limit")
+
+    parser.add_argument("--format",
+                        type=str,
+                        default="",
+                        choices=["", "csv", "jsonl", "columnar"],
+                        help="The format of the output file: csv, jsonl or columnar. By default it is inferred from the "
+                             "extension of the output file (.jsonl, .col, otherwise csv)")
+
+    parser.add_argument("--quiet", action="store_true", help="Do not print the result of every cell")
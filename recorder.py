@@ -0,0 +1,83 @@
+import gzip
+import json
+
+# A trace records the suppression patterns given to the attacker problem and the outcome of every sub-problem solve, so
+# that the sub-problem can be replayed without the master problem. The trace is a gzipped file with a JSON object on each
+# line:
+#
+# header - {"type": "header", "file_name": path} the table the trace was recorded for
+# pattern - {"type": "pattern", "delta": [[cell, supp], ...]} the cells whose suppression level changed since the previous
+#     pattern. Every cell starts unsuppressed
+# reset - {"type": "reset"} the HIGH and LOW parameters were reset to the nominal values
+# solve - {"type": "solve", "reset_model": bool, "refresh_bounds": bool, "extended": bool, "max_constraints": int,
+#     "cuts": [[sensitive cell, maximise, [[[[cell, coefficient], ...], rhs], ...]], ...], "high": [[cell, value], ...],
+#     "low": [[cell, value], ...], "stopped": bool, "time": seconds} a sub-problem solve, its constraints and the HIGH and
+#     LOW parameters of the cells that moved from their nominal value afterwards
+
+
+class TraceRecorder:
+    """Writes the events of a sub-problem and its attacker problem to a trace file"""
+
+    def __init__(self, trace_file, file_name=""):
+
+        self.f_out = gzip.open(trace_file, "wb")
+        self.pattern = {}
+        self.write({"type": "header", "file_name": file_name})
+
+    def attach(self, sub_problem):
+        """Records the events of a sub-problem and its attacker problem"""
+
+        sub_problem.recorder = self
+        sub_problem.attacker.recorder = self
+
+    def write(self, event):
+        self.f_out.write((json.dumps(event) + "\n").encode("utf-8"))
+
+    def record_pattern(self, supp_level):
+        """Records the cells whose suppression level changed since the previous pattern"""
+
+        delta = [[cell, supp] for cell, supp in supp_level.items() if self.pattern.get(cell, 0) != supp]
+        self.pattern = dict(supp_level)
+        self.write({"type": "pattern", "delta": delta})
+
+    def record_reset(self):
+        self.write({"type": "reset"})
+
+    def record_solve(self, sub_problem, reset_model, refresh_bounds, extended, elapsed):
+        """Records the outcome of a sub-problem solve"""
+
+        nominal = {cell: sub_problem.data["cells"][cell]["nominal"] for cell in sub_problem.HIGH_LOW_cells}
+        self.write({"type": "solve",
+                    "reset_model": reset_model,
+                    "refresh_bounds": refresh_bounds,
+                    "extended": extended,
+                    "max_constraints": sub_problem.max_constraints_per_iteration,
+                    "cuts": [[sensitive_cell, maximise, [[list(coefficients.items()), rhs] for coefficients, rhs in cuts]]
+                             for sensitive_cell, maximise, cuts in sub_problem.found_cuts],
+                    "high": [[cell, sub_problem.HIGH[cell]] for cell in nominal if sub_problem.HIGH[cell] != nominal[cell]],
+                    "low": [[cell, sub_problem.LOW[cell]] for cell in nominal if sub_problem.LOW[cell] != nominal[cell]],
+                    "stopped": sub_problem.stopped,
+                    "time": elapsed})
+
+    def close(self):
+        self.f_out.close()
+
+
+def apply_delta(supp_level, delta, cells):
+    """Applies the delta of a pattern event to a suppression pattern. JSON turns the cell ids into numbers or strings, so
+    they are matched by their string representation
+
+    :param cells: a dictionary from the string representation of each cell to the cell
+    """
+
+    for cell, supp in delta:
+        supp_level[cells[str(cell)]] = supp
+
+
+def events(trace_file):
+    """Reads the events of a trace file"""
+
+    with gzip.open(trace_file, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line.decode("utf-8"))
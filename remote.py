@@ -0,0 +1,261 @@
+from multiprocessing import Process
+from subproblem import SubProblem
+from strengthen import CutStrengthener
+import argparse
+import socket
+import struct
+import json
+
+# A simple protocol to solve attacker problems on remote workers. Every message is a JSON object preceded by its length as a
+# 4 byte big endian unsigned int. The coordinator sends the following messages, each of which is answered by the worker:
+#
+# load - {"op": "load", "data": encoded data, "strengthen": [step, ...], "alternative_cuts": 2} builds the attacker problem
+#     of the table. Every cell starts unsuppressed. The constraints are passed through the cut strengthening steps, if any
+# check - {"op": "check", "delta": [[cell, supp], ...], "jobs": [[sensitive cell, maximise], ...]} changes the suppression
+#     level of the cells in the delta, solves the attacker problems of the jobs, and answers with {"results": [[sensitive cell,
+#     maximise, optimum, cuts, values], ...]}. The cuts are [[[[cell, coefficient], ...], rhs], ...] if the protection level is
+#     violated and null otherwise. The values are [[cell, value], ...] for the suppressed cells in the component of the
+#     sensitive cell if the protection level is met and null otherwise
+# close - {"op": "close"} ends the connection
+#
+# JSON is used rather than pickle so that a worker never executes anything sent over the network. The protocol has no
+# authentication, so workers should only listen on trusted networks.
+
+
+def send_message(sock, message):
+    """Sends a JSON message preceded by its length"""
+
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(struct.pack("!I", len(payload)) + payload)
+
+
+def receive_message(sock):
+    """Receives a JSON message preceded by its length. Returns None if the connection is closed"""
+
+    header = receive_exactly(sock, 4)
+    if header is None:
+        return None
+    payload = receive_exactly(sock, struct.unpack("!I", header)[0])
+    return None if payload is None else json.loads(payload.decode("utf-8"))
+
+
+def receive_exactly(sock, size):
+    """Receives exactly size bytes, or None if the connection is closed first"""
+
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def encode_data(data):
+    """Encodes the data as JSON friendly lists, as JSON objects can only have string keys"""
+
+    encoded = {key: value for key, value in data.items() if key not in ("cells", "relations", "sensitive cells")}
+    encoded["cells"] = [[cell, info] for cell, info in data["cells"].items()]
+    encoded["sensitive cells"] = [[cell, info] for cell, info in data["sensitive cells"].items()]
+    encoded["relations"] = [[relation, lhs, rhs] for relation, (lhs, rhs) in data["relations"].items()]
+    return encoded
+
+
+def decode_data(encoded):
+    """Decodes the data encoded by encode_data"""
+
+    data = {key: value for key, value in encoded.items() if key not in ("cells", "relations", "sensitive cells")}
+    data["cells"] = {cell: info for cell, info in encoded["cells"]}
+    data["sensitive cells"] = {cell: info for cell, info in encoded["sensitive cells"]}
+    data["relations"] = {relation: (lhs, rhs) for relation, lhs, rhs in encoded["relations"]}
+    return data
+
+
+class AttackerWorker:
+    """Holds the attacker problem of a table between messages, so that only the changes to the suppression pattern need to
+    be sent"""
+
+    def __init__(self):
+        self.sub_problem = None
+
+    def handle(self, message):
+        """Handles a single message and returns the answer"""
+
+        if message["op"] == "load":
+            self.sub_problem = SubProblem(None, decode_data(message["data"]))
+            self.sub_problem.attacker.update_bounds({cell: 0 for cell in self.sub_problem.data["cells"].keys()})
+            if message.get("strengthen"):
+                self.sub_problem.strengthener = CutStrengthener(self.sub_problem, message["strengthen"],
+                                                                message.get("alternative_cuts", 2))
+            return {"ok": True}
+
+        elif message["op"] == "check":
+            attacker = self.sub_problem.attacker
+            for cell, supp in message["delta"]:
+                attacker.supp_level[cell] = supp
+                attacker.update_cell_bounds(cell, supp)
+            return {"results": [self.check(sensitive_cell, maximise) for sensitive_cell, maximise in message["jobs"]]}
+
+        raise ValueError("Unknown message {}".format(message["op"]))
+
+    def check(self, sensitive_cell, maximise):
+        """Solves a single attacker problem and encodes the result"""
+
+        sub_problem = self.sub_problem
+        optimum = sub_problem.attacker.optimise(sensitive_cell, maximise)
+
+        if sub_problem.is_violated(sensitive_cell, maximise, optimum):
+            cuts = [[list(coefficients.items()), rhs] for coefficients, rhs in sub_problem.find_cuts(sensitive_cell, maximise)]
+            return [sensitive_cell, maximise, optimum, cuts, None]
+
+        component = sub_problem.components[sub_problem.component_of[sensitive_cell]]
+        values = [[cell, sub_problem.attacker.vars[cell].x] for cell in component
+                  if sub_problem.attacker.supp_level[cell] > 0.5]
+        return [sensitive_cell, maximise, optimum, None, values]
+
+
+def serve(listener):
+    """Answers the messages of one coordinator at a time on a listening socket, forever"""
+
+    while True:
+        connection, _ = listener.accept()
+        worker = AttackerWorker()
+        try:
+            while True:
+                message = receive_message(connection)
+                if message is None or message["op"] == "close":
+                    break
+                send_message(connection, worker.handle(message))
+        finally:
+            connection.close()
+
+
+def listen(host, port):
+    """Creates a listening socket. Port 0 picks a free port"""
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(1)
+    return listener
+
+
+class RemoteAttackers:
+    """The coordinator of a number of remote workers. The attacker problems of each sub-problem iteration are split between
+    the workers, and only the cells whose suppression level changed since the last message are sent to each worker. The
+    workers strengthen the constraints they find with the given cut strengthening steps, as the sub-problem would.
+    """
+
+    def __init__(self, data, addresses, strengthen=(), alternative_cuts=2):
+
+        # The steps are checked here, as an unknown step would only be found by the workers
+        for step in strengthen:
+            if step not in CutStrengthener.steps:
+                raise ValueError("Unknown cut strengthening step {}".format(step))
+
+        # Connect to every worker and load the table
+        self.connections = []
+        for host, port in addresses:
+            connection = socket.create_connection((host, port))
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections.append(connection)
+
+        encoded = encode_data(data)
+        for connection in self.connections:
+            send_message(connection, {"op": "load", "data": encoded, "strengthen": list(strengthen),
+                                      "alternative_cuts": alternative_cuts})
+        for connection in self.connections:
+            receive_message(connection)
+
+        # The suppression pattern each worker currently holds
+        self.patterns = [{cell: 0 for cell in data["cells"].keys()} for _ in self.connections]
+
+    def evaluate(self, supp_level, jobs):
+        """Solves the attacker problems of the jobs for a suppression pattern on the workers
+
+        :param supp_level: the suppression level of every cell
+        :param jobs: a list of (sensitive cell, maximise)
+        :return: a dictionary from (sensitive cell, maximise) to a result in the same form as SubProblem.attack
+        """
+
+        # Send the jobs round robin so that every worker gets a similar mix of directions, and then wait for all the answers
+        sent = []
+        for i, connection in enumerate(self.connections):
+            worker_jobs = jobs[i::len(self.connections)]
+            if not worker_jobs:
+                continue
+
+            delta = [[cell, supp] for cell, supp in supp_level.items() if self.patterns[i][cell] != supp]
+            for cell, supp in delta:
+                self.patterns[i][cell] = supp
+            send_message(connection, {"op": "check", "delta": delta, "jobs": [list(job) for job in worker_jobs]})
+            sent.append(connection)
+
+        results = {}
+        for connection in sent:
+            for sensitive_cell, maximise, optimum, cuts, values in receive_message(connection)["results"]:
+                results[sensitive_cell, maximise] = {
+                    "optimum": optimum,
+                    "cuts": None if cuts is None else [({cell: value for cell, value in coefficients}, rhs)
+                                                       for coefficients, rhs in cuts],
+                    "values": None if values is None else {cell: value for cell, value in values}}
+        return results
+
+    def close(self):
+        """Ends the connection with every worker"""
+
+        for connection in self.connections:
+            send_message(connection, {"op": "close"})
+            connection.close()
+
+
+class LocalWorkers:
+    """Starts a number of workers as processes on this host, which use the same protocol as remote workers. This is useful
+    for testing and for using several cores of a single host. The workers must be started before any Gurobi model is built
+    so that they do not inherit the Gurobi environment of this process."""
+
+    def __init__(self, workers):
+
+        self.listeners = [listen("127.0.0.1", 0) for _ in range(workers)]
+        self.processes = [Process(target=serve, args=(listener,)) for listener in self.listeners]
+        for process in self.processes:
+            process.daemon = True
+            process.start()
+
+    def addresses(self):
+        return [listener.getsockname() for listener in self.listeners]
+
+    def close(self):
+        for process in self.processes:
+            process.terminate()
+        for listener in self.listeners:
+            listener.close()
+
+
+def parse_addresses(addresses):
+    """Parses a comma separated list of host:port"""
+
+    parsed = []
+    for address in addresses.split(","):
+        host, port = address.strip().rsplit(":", 1)
+        parsed.append((host, int(port)))
+    return parsed
+
+
+if __name__ == "__main__":
+    """This is what will be run when this script is executed, e.g., when python remote.py --port 5000 is called from the
+    commandline on a worker host"""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="the address the worker listens on. By default only this host can connect, so the address of "
+                             "another interface, e.g., 0.0.0.0, must be given to accept connections from other hosts")
+    parser.add_argument("--port", type=int, default=5000, help="the port the worker listens on")
+    args = parser.parse_args()
+
+    # The protocol has no authentication, so anyone who can reach the worker can send it tables
+    print("Attacker worker listening on {}:{}".format(args.host, args.port))
+    if not args.host.startswith("127.") and args.host != "localhost":
+        print("Warning: the worker accepts connections without authentication from any host that can reach this address")
+    serve(listen(args.host, args.port))
@@ -0,0 +1,115 @@
+from subproblem import SubProblem
+from strengthen import CutStrengthener
+from cache import AttackerCache
+from recorder import events, apply_delta
+import argparse
+import time
+import read
+
+
+def replay(data, trace_file, adaptive_order=False, strengthen=(), alternative_cuts=2, cache_size=0, tolerance=1e-6):
+    """Drives a sub-problem, without a master problem, through the suppression patterns and solves of a trace. Every solve
+    is compared with the recorded one, so different settings of the sub-problem can be compared on exactly the same
+    sequence of patterns.
+
+    :param data: the data of the table the trace was recorded for
+    :param trace_file: a trace written by a TraceRecorder
+    :return: a dictionary with the number of solves, the recorded and replayed time of the solves, the number of attacker
+        problems solved and skipped, and the number of solves whose outcome differs from the recorded one
+    """
+
+    sub_problem = SubProblem(None, data, adaptive=adaptive_order)
+    if strengthen:
+        sub_problem.strengthener = CutStrengthener(sub_problem, strengthen, alternative_cuts)
+    if cache_size > 0:
+        sub_problem.cache = AttackerCache(cache_size)
+
+    # JSON turns the cell ids into numbers or strings, so they are matched by their string representation
+    cells = {str(cell): cell for cell in data["cells"].keys()}
+    supp_level = {cell: 0 for cell in data["cells"].keys()}
+
+    summary = {"solves": 0, "recorded_time": 0.0, "replayed_time": 0.0, "different_feasibility": 0,
+               "different_violations": 0, "different_high_low": 0}
+    for event in events(trace_file):
+        if event["type"] == "pattern":
+            apply_delta(supp_level, event["delta"], cells)
+            sub_problem.attacker.update_bounds(dict(supp_level))
+
+        elif event["type"] == "reset":
+            sub_problem.reset_high_low()
+
+        elif event["type"] == "solve":
+            sub_problem.max_constraints_per_iteration = event["max_constraints"]
+            start = time.time()
+            sub_problem.solve(event["reset_model"], event["refresh_bounds"], event["extended"])
+            summary["replayed_time"] += time.time() - start
+            summary["recorded_time"] += event["time"]
+            summary["solves"] += 1
+
+            # Whether the pattern is feasible must not change. Which protection levels are found violated, and how far HIGH
+            # and LOW move, can change with the order and the number of attacker problems that are solved
+            recorded = set((cells[str(cell)], maximise) for cell, maximise, _ in event["cuts"])
+            replayed = set((cell, maximise) for cell, maximise, _ in sub_problem.found_cuts)
+            if bool(recorded) != bool(replayed):
+                summary["different_feasibility"] += 1
+            if recorded != replayed:
+                summary["different_violations"] += 1
+            if any(abs(sub_problem.HIGH[cells[str(cell)]] - value) > tolerance for cell, value in event["high"]) or \
+                    any(abs(sub_problem.LOW[cells[str(cell)]] - value) > tolerance for cell, value in event["low"]):
+                summary["different_high_low"] += 1
+
+    summary["attacker_solves"] = sub_problem.attacker_solves
+    summary["attacker_skips"] = sub_problem.attacker_skips
+    if sub_problem.strengthener:
+        sub_problem.strengthener.print_stats()
+    if sub_problem.cache is not None:
+        sub_problem.cache.print_stats()
+    return summary
+
+
+def header(trace_file):
+    """Returns the header of a trace file"""
+
+    for event in events(trace_file):
+        return event
+
+
+def arguments():
+    """Reads the arguments that can be given when executing the replay.py file. Type python replay.py --help for an
+    explanation of the different parameters
+
+    :return: an argparse object. Arguments are called by args.argument_name
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace", type=str, help="give relative path to a trace written with suppress.py --trace")
+
+    parser.add_argument("--file_name", type=str, default="",
+                        help="the data file of the table. By default the file the trace was recorded for is used")
+
+    parser.add_argument("--adaptive_order", type=int, default=0, help="replay with the adaptive scheduler")
+
+    parser.add_argument("--strengthen", type=str, default="", help="replay with these cut strengthening steps")
+
+    parser.add_argument("--alternative_cuts", type=int, default=2,
+                        help="the number of alternative constraints of the alternative strengthening step")
+
+    parser.add_argument("--cache_size", type=int, default=0, help="replay with an attacker cache of this size")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    """This is what will be run when this script is executed, e.g., when python replay.py example.trace.gz is called from
+    the commandline"""
+
+    args = arguments()
+    data = read.data(args.file_name or header(args.trace)["file_name"])
+    summary = replay(data, args.trace, args.adaptive_order, [step for step in args.strengthen.split(",") if step],
+                     args.alternative_cuts, args.cache_size)
+
+    print("{} solves replayed in {:.2f} seconds, recorded in {:.2f} seconds".format(
+        summary["solves"], summary["replayed_time"], summary["recorded_time"]))
+    print("{} attacker problems solved, {} skipped".format(summary["attacker_solves"], summary["attacker_skips"]))
+    print("{} solves with a different feasibility, {} with different violations, {} with different HIGH and LOW".format(
+        summary["different_feasibility"], summary["different_violations"], summary["different_high_low"]))
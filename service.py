@@ -0,0 +1,213 @@
+from solver import Solver
+from budget import Budget, trivial_bounds
+from remote import send_message, receive_message
+import argparse
+import socket
+import stat
+import time
+import os
+import read
+
+# A resident service that keeps tables, their models and the constraints found by the sub-problem in memory between
+# requests. The messages use the same framing as remote.py, i.e., a JSON object preceded by its length. Every request is
+# answered with a JSON object, which has an "error" key if the request failed:
+#
+# load - {"op": "load", "table": name, "file_name": path} reads a table and builds its solver. The optional keys
+#     ampl_relations, ignore_starting_constraints, adaptive_order, strengthen, alternative_cuts, cache_size and threads are
+#     the same as the flags of suppress.py
+# update - {"op": "update", "table": name, "cells": [{"cell": cell, "sensitive": true, "UPL": 5, ...}, ...]} changes any of
+#     sensitive, UPL, LPL, weight, lb and ub of a number of cells. Only the constraints that depend on the changes are
+#     removed from the master problem
+# solve - {"op": "solve", "table": name} runs the diving heuristic and removes the redundant suppressions, starting from
+#     the constraints found by earlier solves. The optional keys heuristic_time, heuristic_constraints, multiplier,
+#     heuristic_gap and deadline are the same as the flags of suppress.py
+# unload - {"op": "unload", "table": name} frees a table
+# tables - {"op": "tables"} lists the loaded tables
+# close - {"op": "close"} ends the connection
+# shutdown - {"op": "shutdown"} ends the connection and stops the service
+
+
+class SuppressionService:
+    """Holds the solver of every loaded table between requests"""
+
+    def __init__(self):
+        self.tables = {}
+
+    def handle(self, message):
+        """Handles a single request and returns the answer"""
+
+        start = time.time()
+        if message["op"] == "load":
+            answer = self.load(message)
+        elif message["op"] == "update":
+            answer = self.update(message)
+        elif message["op"] == "solve":
+            answer = self.solve(message)
+        elif message["op"] == "unload":
+            del self.tables[message["table"]]
+            answer = {}
+        elif message["op"] == "tables":
+            answer = {"tables": sorted(self.tables.keys())}
+        else:
+            raise ValueError("Unknown request {}".format(message["op"]))
+
+        answer["time"] = time.time() - start
+        return answer
+
+    def load(self, message):
+        """Reads a table and builds its solver"""
+
+        if message.get("ampl_relations"):
+            data = read.files(message["file_name"], message["ampl_relations"])
+        else:
+            data = read.data(message["file_name"])
+
+        solver = Solver(data, message.get("ignore_starting_constraints", False), message.get("adaptive_order", False),
+                        [step for step in message.get("strengthen", "").split(",") if step],
+                        message.get("alternative_cuts", 2), message.get("cache_size", 0),
+                        threads=message.get("threads", 0))
+        self.tables[message["table"]] = solver
+
+        return {"cells": len(data["cells"]),
+                "sensitive": len(data["sensitive cells"]),
+                "relations": len(data["relations"])}
+
+    def update(self, message):
+        """Changes the data of a number of cells of a table"""
+
+        solver = self.tables[message["table"]]
+
+        # JSON turns the cell ids into numbers or strings, so they are matched by their string representation
+        cells = {str(cell): cell for cell in solver.data["cells"].keys()}
+        changes = {}
+        for change in message["cells"]:
+            if str(change["cell"]) not in cells:
+                raise ValueError("Cell {} is not in the table".format(change["cell"]))
+            changes[cells[str(change["cell"])]] = {key: value for key, value in change.items() if key != "cell"}
+
+        removed = solver.update_cells(changes)
+        return {"cuts_removed": removed, "cuts": len(solver.master.cuts)}
+
+    def solve(self, message):
+        """Runs the diving heuristic and removes the redundant suppressions. The suppressed cells are returned with their
+        bounds"""
+
+        solver = self.tables[message["table"]]
+        budget = Budget(message.get("deadline", 0))
+        solver.budget = budget
+        solver.sub_problem.budget = budget
+        solver.reset_incumbent()
+
+        found = solver.solve(max_iterations_per_sub_problem=message.get("heuristic_constraints", 50),
+                             time_limit=message.get("heuristic_time", 1),
+                             dummy_multiplier=message.get("multiplier", 1),
+                             gap=message.get("heuristic_gap", 0),
+                             complete=False)
+        if found:
+            supp_levels, bounds = solver.remove_redundant_suppressions()
+            solver.incumbent.update(supp_levels, solver.master.results(supp_levels)["objective"], bounds)
+        if solver.incumbent.bounds is None:
+            solver.incumbent.bounds = trivial_bounds(solver.data, solver.incumbent.supp_levels)
+
+        answer = solver.master.results(solver.incumbent.supp_levels)
+        answer["found"] = found
+        answer["cuts"] = len(solver.master.cuts)
+        answer["suppressed"] = [[cell, solver.incumbent.bounds[cell][0], solver.incumbent.bounds[cell][1]]
+                                for cell, supp in solver.incumbent.supp_levels.items() if supp > 0.5]
+        return answer
+
+
+def serve(service, listener):
+    """Answers the requests of one client at a time until a shutdown request is received"""
+
+    while True:
+        connection, _ = listener.accept()
+        try:
+            while True:
+                message = receive_message(connection)
+                if message is None or message["op"] in ("close", "shutdown"):
+                    break
+                try:
+                    answer = service.handle(message)
+                except Exception as error:
+                    answer = {"error": "{}: {}".format(type(error).__name__, error)}
+                send_message(connection, answer)
+        finally:
+            connection.close()
+
+        if message is not None and message["op"] == "shutdown":
+            break
+
+
+def listen(port=5001, unix_socket=""):
+    """Creates a listening socket on localhost, or on a Unix socket if a path is given"""
+
+    if unix_socket:
+
+        # A Unix socket left behind by an earlier service is removed, but no other kind of file
+        if os.path.exists(unix_socket):
+            if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                raise ValueError("{} exists and is not a socket".format(unix_socket))
+            os.remove(unix_socket)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(unix_socket)
+    else:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(("127.0.0.1", port))
+
+    listener.listen(1)
+    return listener
+
+
+class ServiceClient:
+    """A client of the service, e.g., for an interactive tool.
+
+    client = ServiceClient(port=5001)
+    client.request("load", table="example", file_name="example.csp")
+    client.request("update", table="example", cells=[{"cell": 3, "UPL": 10}])
+    client.request("solve", table="example")
+    """
+
+    def __init__(self, port=5001, unix_socket=""):
+
+        if unix_socket:
+            self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.connection.connect(unix_socket)
+        else:
+            self.connection = socket.create_connection(("127.0.0.1", port))
+
+    def request(self, op, **fields):
+        """Sends a request and returns the answer. Raises a RuntimeError if the request failed"""
+
+        fields["op"] = op
+        send_message(self.connection, fields)
+        answer = receive_message(self.connection)
+        if answer is None:
+            raise RuntimeError("The service closed the connection")
+        if "error" in answer:
+            raise RuntimeError(answer["error"])
+        return answer
+
+    def close(self):
+        send_message(self.connection, {"op": "close"})
+        self.connection.close()
+
+    def shutdown(self):
+        """Stops the service"""
+
+        send_message(self.connection, {"op": "shutdown"})
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    """This is what will be run when this script is executed, e.g., when python service.py --port 5001 is called from the
+    commandline"""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=5001, help="the port the service listens on, on localhost")
+    parser.add_argument("--unix_socket", type=str, default="", help="listen on a Unix socket at this path instead")
+    args = parser.parse_args()
+
+    print("Suppression service listening on {}".format(args.unix_socket or "127.0.0.1:{}".format(args.port)))
+    serve(SuppressionService(), listen(args.port, args.unix_socket))
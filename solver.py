@@ -1,17 +1,136 @@
 from master import Master
 from subproblem import SubProblem
+from strengthen import CutStrengthener
+from cache import AttackerCache
+from pipeline import dive_callback
+from budget import Incumbent, trivial_bounds
 from gurobipy import *
 
 
 class Solver:
     """The solver consists of the full Benders decomposition and can be run either as a diving heuristic of a complete search"""
 
-    def __init__(self, data, ignore_starting_constraints=False):
+    def __init__(self, data, ignore_starting_constraints=False, adaptive_order=False, strengthen=(), alternative_cuts=2,
+                 cache_size=0, pool=None, pipeline_violations=50, threads=0, budget=None, remote=None):
         self.data = data
 
+        # An optional Budget that limits the total time of all the phases
+        self.budget = budget
+        self.time_limit = 0
+
+        # An optional AttackerPool that checks the intermediate solutions of the master problem during the diving heuristic
+        self.pool = pool
+        self.pipeline_violations = pipeline_violations
+
         # Create the master and sub-problem objects
         self.master = Master(self.data, ignore_starting_constraints)
-        self.sub_problem = SubProblem(self.master, self.data)
+        self.sub_problem = SubProblem(self.master, self.data, adaptive=adaptive_order)
+
+        # Record whether the pipeline or the budget stopped the last solve of the master problem on purpose, so that the
+        # budget does not mistake it for an interruption
+        self.master.mdl._pipeline_stop = False
+        self.master.mdl._budget_stop = False
+
+        # Limit the number of threads Gurobi uses, e.g., when several tables are protected at the same time
+        if threads > 0:
+            self.master.mdl.setParam("Threads", threads)
+            self.sub_problem.attacker.m.setParam("Threads", threads)
+
+        # Optionally pass the constraints found by the sub-problem through the given cut strengthening steps
+        if strengthen:
+            self.sub_problem.strengthener = CutStrengthener(self.sub_problem, strengthen, alternative_cuts)
+
+        # Optionally store the results of the attacker problems so repeated suppression patterns are not solved again
+        if cache_size > 0:
+            self.sub_problem.cache = AttackerCache(cache_size)
+
+        # The sub-problem stops early if the budget expires
+        self.sub_problem.budget = budget
+
+        # Optionally solve the attacker problems on remote workers
+        self.sub_problem.remote = remote
+
+        # The best feasible suppression pattern found so far
+        self.incumbent = None
+        self.reset_incumbent()
+
+    def reset_incumbent(self):
+        """Sets the incumbent to the pattern that suppresses every non-zero cell, which is always feasible"""
+
+        supp_levels = {cell: 0 if info["nominal"] == 0 else 1 for cell, info in self.data["cells"].items()}
+        self.incumbent = Incumbent(supp_levels, self.master.results(supp_levels)["objective"])
+
+    def update_cells(self, changes):
+        """Changes the data of a number of cells so that the next solve uses the new data, without rebuilding the master
+        problem or the attacker problem. The constraints found by the sub-problem remain in the master problem unless they
+        depend on the changed data, i.e., they protect a cell whose protection levels changed or have a coefficient that
+        depends on a cell whose bounds changed. If the cut strengthener is used, constraints also depend on which cells of
+        their component are sensitive, so all the constraints of a component are removed if a cell in it stops being
+        sensitive or a sensitive cell in it changes its bounds.
+
+        :param changes: a dictionary from each cell to a dictionary with any of the keys sensitive, UPL, LPL, weight, lb
+            and ub
+        :return: the number of constraints removed from the master problem
+        """
+
+        # Check the changes before any of them are made so that the data and the models stay consistent
+        for cell, change in changes.items():
+            info = self.data["cells"][cell]
+            sensitive = change.get("sensitive", info["sensitive"])
+            if ("UPL" in change or "LPL" in change) and not sensitive:
+                raise ValueError("Cell {} is not sensitive so it has no protection levels".format(cell))
+
+            # Structural zeros can never be suppressed, so they cannot be sensitive either
+            if change.get("sensitive") and info["nominal"] == 0:
+                raise ValueError("Cell {} has a zero nominal so it cannot be sensitive".format(cell))
+
+            # The bounds must contain the nominal, otherwise the cell has a negative room to move
+            lb, ub = float(change.get("lb", info["lb"])), float(change.get("ub", info["ub"]))
+            if ("lb" in change or "ub" in change) and not lb <= info["nominal"] <= ub:
+                raise ValueError("The bounds of cell {} do not contain its nominal {}".format(cell, info["nominal"]))
+
+        bounds_changed, levels_changed, components_changed = set(), set(), set()
+        for cell, change in changes.items():
+            info = self.data["cells"][cell]
+            was_sensitive = bool(info["sensitive"])
+
+            if "weight" in change:
+                info["weight"] = change["weight"]
+
+            if "lb" in change or "ub" in change:
+                info["lb"] = float(change.get("lb", info["lb"]))
+                info["ub"] = float(change.get("ub", info["ub"]))
+                info["LB"] = info["nominal"] - info["lb"]
+                info["UB"] = info["ub"] - info["nominal"]
+                bounds_changed.add(cell)
+                if was_sensitive:
+                    components_changed.add(self.sub_problem.component_of[cell])
+
+            if "sensitive" in change and bool(change["sensitive"]) != was_sensitive:
+                info["sensitive"] = bool(change["sensitive"])
+                levels_changed.add(cell)
+                if info["sensitive"]:
+                    self.data["sensitive cells"][cell] = {"UPL": 0, "LPL": 0}
+                else:
+                    del self.data["sensitive cells"][cell]
+                    components_changed.add(self.sub_problem.component_of[cell])
+
+            if "UPL" in change or "LPL" in change:
+                for level in ("UPL", "LPL"):
+                    self.data["sensitive cells"][cell][level] = float(change.get(level,
+                                                                                 self.data["sensitive cells"][cell][level]))
+                levels_changed.add(cell)
+
+        if self.sub_problem.strengthener is None:
+            components_changed = set()
+
+        removed = self.master.remove_cuts(
+            lambda sensitive_cell, coefficients: sensitive_cell in levels_changed or
+            any(cell in coefficients for cell in bounds_changed) or
+            self.sub_problem.component_of[sensitive_cell] in components_changed)
+        self.master.update_cells(list(changes.keys()))
+        self.sub_problem.refresh(list(changes.keys()))
+        return removed
 
     def solve(self, max_iterations_per_sub_problem, time_limit, dummy_multiplier, gap, complete):
         """ Execute the Benders Decomposition according to the following parameters
@@ -21,10 +140,12 @@ class Solver:
         :param dummy_multiplier: Used to control how quickly the heuristic increases the current number of suppressions
         :param gap: The acceptable limit for the master problem
         :param complete: A boolean that indicates whether the heuristic or complete solve should be called
+        :return: True if the heuristic finds a feasible solution (always True for the complete solve)
         """
 
         self.sub_problem.max_constraints_per_iteration = max_iterations_per_sub_problem
-        self.master.mdl.setParam("TimeLimit", time_limit)
+        self.time_limit = time_limit
+        self.master.mdl.setParam("TimeLimit", self.budget.limit(time_limit) if self.budget else time_limit)
         self.master.mdl.setParam("MIPGap", gap)
 
         # Execute either the complete solve or the heuristic. Note the complete solve requires LazyConstraints
@@ -32,9 +153,12 @@ class Solver:
             self.master.mdl.setParam('OutputFlag', True)
             self.master.mdl.params.LazyConstraints = 1
             self.complete_solve()
+            return True
         else:
             self.master.mdl.setParam('OutputFlag', False)
-            self.heuristic_solve(dummy_multiplier)
+            if self.pool is not None:
+                self.master.mdl.params.LazyConstraints = 1
+            return self.heuristic_solve(dummy_multiplier)
 
     def heuristic_solve(self, dummy_multiplier):
         """Executes the diving heuristic. The term 'diving' implies that there is no backtracking. Hence once a cell is
@@ -43,21 +167,39 @@ class Solver:
         To speed up the heuristic we use a 'dummy_multiplier' to ensure that between subsequent solves of the master problem, at
         least a certain more suppressions must be performed. This is achieved through a 'dummy_constraint' that we must track
         carefully and remove if we are to then run the complete solver.
+
+        If there is a budget, the time limit of each master problem is capped by the remaining time and the heuristic stops
+        without a solution once the budget expires.
+
+        :return: True if a feasible solution is found
         """
 
         # The HIGH LOW parameters are set to the nominal values, and to begin the dummy constraint does not exist
         self.sub_problem.reset_high_low()
         dummy_constraint = 0
+        iterations = 0
+        found = False
 
         # Iterate until a solution is found
         while True:
+            iterations += 1
 
             # The master problem is solved until a limit is reached (gap or time)
-            self.master.mdl.optimize()
+            if self.budget:
+                self.master.mdl.setParam("TimeLimit", self.budget.limit(self.time_limit))
+            self.optimise_master()
 
             # Remove the dummy constraint
             if dummy_constraint:
                 self.master.mdl.remove(dummy_constraint)
+                dummy_constraint = 0
+
+            # Stop if the budget has expired or the master problem has no solution
+            if self.budget:
+                self.budget.check_model(self.master.mdl)
+                if self.budget.should_stop() or self.master.mdl.SolCount == 0:
+                    print("Diving heuristic stopped before a solution was found")
+                    break
 
             # The suppression patterns is then used to update the bounds in the attacker subproblem
             supp_levels = {cell: var.x for cell, var in self.master.vars.items()}
@@ -65,6 +207,9 @@ class Solver:
 
             # The sub-problems are solved and the HIGH LOW parameters never need to be refreshed - this is incorrect for complete
             self.sub_problem.solve(refresh_bounds=False)
+            if self.sub_problem.stopped:
+                print("Diving heuristic stopped before a solution was found")
+                break
 
             # Check to see if any constraints must be added
             if self.sub_problem.constraints_added > 0:
@@ -88,10 +233,67 @@ class Solver:
             # If no constraints are added then the solution is feasible
             else:
                 print("SOLUTION FOUND!!!!!!!!!!!")
+                print("{} iterations".format(iterations))
+                print("{} attacker problems solved, {} skipped".format(self.sub_problem.attacker_solves,
+                                                                       self.sub_problem.attacker_skips))
+                if self.sub_problem.strengthener:
+                    self.sub_problem.strengthener.print_stats()
+                if self.sub_problem.cache is not None:
+                    self.sub_problem.cache.print_stats()
+                found = True
                 break
 
         # Remove the additional restrictions
         self.reset_lower_bounds()
+        return found
+
+    def hypercube_solve(self, max_iterations_per_sub_problem, beam):
+        """Protects every sensitive cell with a cheap hypercube instead of solving the master problem. The pattern is checked
+        by the sub-problem. If it violates a protection level, the constraints found are added to the master problem and
+        the cells of the pattern are fixed as suppressed, so that the diving heuristic continues from the pattern.
+
+        :return: the suppression pattern if it is feasible, otherwise None
+        """
+
+        # NumPy is only needed by the hypercube engine
+        from hypercube import protect
+
+        supp_levels, unprotected = protect(self.data, beam, self.budget)
+        print("Hypercubes found for {} of {} sensitive cells".format(len(self.data["sensitive cells"]) - len(unprotected),
+                                                                      len(self.data["sensitive cells"])))
+
+        self.sub_problem.max_constraints_per_iteration = max_iterations_per_sub_problem
+        self.sub_problem.attacker.update_bounds(supp_levels)
+        self.sub_problem.solve(refresh_bounds=True)
+        if not self.sub_problem.stopped and self.sub_problem.constraints_added == 0:
+            print("Hypercube pattern is feasible")
+            return supp_levels
+
+        print("Hypercube pattern is not feasible, continuing with the diving heuristic")
+        for cell, supp in supp_levels.items():
+            self.master.vars[cell].setAttr(GRB.Attr.LB, supp)
+        return None
+
+    def optimise_master(self):
+        """Solves the master problem during the diving heuristic. If there is an AttackerPool the intermediate solutions are
+        checked by the pool while the master problem is being solved, and the master problem is stopped early once enough
+        violations are found. The constraints found by the pool are then added to the master problem permanently"""
+
+        self.master.mdl._pipeline_stop = False
+        if self.pool is None:
+            self.master.mdl.optimize()
+            return
+
+        # Overloads the model variable with additional parameters so they can be used in the callback
+        self.pool.violations = 0
+        self.master.mdl._vars = self.master.vars
+        self.master.mdl._pool = self.pool
+        self.master.mdl._pipeline_violations = self.pipeline_violations
+        self.master.mdl._pipeline_cuts = []
+
+        self.master.mdl.optimize(dive_callback)
+        for sensitive_cell, maximise, cuts in self.master.mdl._pipeline_cuts:
+            self.sub_problem.add_cuts_to_master(sensitive_cell, maximise, cuts)
 
     def reset_lower_bounds(self):
         """Resets the lower bounds of the variables in the master problem to their initial values, i.e., sensitive cells are 1
@@ -111,9 +313,16 @@ class Solver:
         self.master.mdl._vars = self.master.vars
         self.master.mdl._data = self.data
         self.master.mdl._sub_problem = self.sub_problem
+        self.master.mdl._budget = self.budget
+        self.master.mdl._incumbent = self.incumbent
+        self.master.mdl._budget_stop = False
 
         # Solves the model
         self.master.mdl.optimize(my_callback)
+        if self.budget:
+            self.budget.check_model(self.master.mdl)
+        if self.sub_problem.cache is not None:
+            self.sub_problem.cache.print_stats()
 
     def add_trivial_mip_start(self):
         """Adds the starting solution where all cells are supppressed. Currently this is unused."""
@@ -122,16 +331,24 @@ class Solver:
             is_zero = self.data["cells"][cell]["nominal"] == 0
             var.start = 0.0 if is_zero else 1.0
 
-    def remove_redundant_suppressions(self):
+    def remove_redundant_suppressions(self, supp_levels=None):
         """Removes redundant suppressions by resolving the subproblem whilst also tracking secondary suppressions. If
         the HIGH and LOW values are the same afterwards then this implies a redundancy. This does not ensure that all
-        redundancies are found but does provide a bound on all suppressed cells."""
+        redundancies are found but does provide a bound on all suppressed cells.
+
+        The suppression pattern of the current solution of the master problem is used unless one is given. If the budget
+        expires the suppression pattern is returned unchanged with the trivial bounds."""
 
         # Update the bounds on the subproblem and resolve in the extended mode (tracks the secondary suppressions)
-        supp_levels = {cell: var.x for cell, var in self.master.vars.items()}
+        supp_levels = {cell: var.x for cell, var in self.master.vars.items()} if supp_levels is None else dict(supp_levels)
         self.sub_problem.attacker.update_bounds(supp_levels)
         self.sub_problem.solve(refresh_bounds=True, extended=True)
 
+        # Without all the HIGH and LOW values it is not safe to remove any suppressions
+        if self.sub_problem.stopped:
+            print("Redundancy removal stopped before it finished")
+            return supp_levels, trivial_bounds(self.data, supp_levels)
+
         # Check
         redundancies_found = 0
         bounds = {}
@@ -157,7 +374,13 @@ class Solver:
 
 
 def my_callback(model, where):
-    """The callback function used in the complete solve."""
+    """The callback function used in the complete solve. Integer feasible solutions that pass the subproblem are stored as
+    the incumbent, and the solve is stopped when the budget expires."""
+
+    if model._budget and model._budget.should_stop():
+        model._budget_stop = True
+        model.terminate()
+        return
 
     # Whenever an integer feasible solution is found
     if where == GRB.Callback.MIPSOL:
@@ -167,6 +390,12 @@ def my_callback(model, where):
         model._sub_problem.attacker.update_bounds(supp_levels)
         model._sub_problem.solve()
 
+        # The solution can only be trusted if the subproblem checked every sensitive cell
+        if model._sub_problem.stopped:
+            model.terminate()
+        elif model._sub_problem.constraints_added == 0:
+            model._incumbent.update(supp_levels, model.cbGet(GRB.Callback.MIPSOL_OBJ))
+
 
 
 
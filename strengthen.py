@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+
+class CutStrengthener:
+    """Strengthens the constraints found by the sub-problem before they are added to the master problem. The following steps
+    can be switched on independently so that their effect on the number of iterations can be compared:
+
+    tighten - the cells whose master variable is fixed by its domain are removed. Sensitive cells are always suppressed so
+        their coefficients are moved to the right hand side, and structural zeros are never suppressed so they are dropped.
+        The remaining coefficients are then capped at the reduced right hand side.
+    alternative - the attacker problem is re-solved with the unsuppressed cells of the previous constraints opened up. The
+        reduced costs of any solution to the attacker problem give a valid constraint, since dual feasibility does not depend
+        on the bounds, and opening up cells forces the attacker to use different cells.
+    check - an alternative constraint is only added if it is violated by the current suppression pattern. The original
+        constraint is always added as it is violated by construction.
+    """
+
+    steps = ("tighten", "alternative", "check")
+
+    def __init__(self, sub_problem, steps, alternative_cuts=2, tolerance=1e-6):
+
+        # The sub-problem is used to access the attacker problem and to read the constraints from it
+        self.sub_problem = sub_problem
+        self.data = sub_problem.data
+        self.attacker = sub_problem.attacker
+
+        for step in steps:
+            if step not in self.steps:
+                raise ValueError("Unknown cut strengthening step {}".format(step))
+        self.active = set(steps)
+        self.alternative_cuts = alternative_cuts
+        self.tolerance = tolerance
+
+        # Statistics on the effect of each step
+        self.stats = defaultdict(int)
+
+    def strengthen(self, sensitive_cell, maximise, coefficients, rhs):
+        """Returns the list of (coefficients, rhs) constraints that should replace the given constraint"""
+
+        self.stats["constraints"] += 1
+        kept = [self.tighten(coefficients, rhs) if "tighten" in self.active else (coefficients, rhs)]
+        if "alternative" not in self.active:
+            self.stats["added"] += 1
+            return kept
+
+        # Drop the alternative constraints that are duplicates, redundant or not violated by the current suppression pattern
+        for cut_coefficients, cut_rhs in self.alternatives(sensitive_cell, maximise, coefficients):
+            if (cut_coefficients, cut_rhs) in kept:
+                self.stats["duplicate"] += 1
+            elif cut_rhs <= self.tolerance:
+                self.stats["redundant"] += 1
+            elif "check" in self.active and not self.is_violated(cut_coefficients, cut_rhs):
+                self.stats["not violated"] += 1
+            else:
+                kept.append((cut_coefficients, cut_rhs))
+
+        self.stats["added"] += len(kept)
+        return kept
+
+    def tighten(self, coefficients, rhs):
+        """Removes the cells whose master variable is fixed and caps the remaining coefficients at the right hand side"""
+
+        # Sensitive cells are always suppressed so they can be moved to the right hand side
+        fixed = sum(value for cell, value in coefficients.items() if self.data["cells"][cell]["sensitive"])
+        rhs -= fixed
+
+        tightened = {}
+        for cell, value in coefficients.items():
+
+            # Sensitive cells are accounted for and structural zeros can never be suppressed
+            if self.data["cells"][cell]["sensitive"] or self.data["cells"][cell]["nominal"] == 0 or value <= 0:
+                continue
+
+            tightened[cell] = min(value, rhs)
+            if tightened[cell] < value:
+                self.stats["coefficients tightened"] += 1
+
+        self.stats["rhs reduction"] += fixed
+        return tightened, rhs
+
+    def alternatives(self, sensitive_cell, maximise, coefficients):
+        """Re-solves the attacker problem with the unsuppressed cells of the previous constraints opened up to find
+        constraints from alternative solutions of the attacker problem"""
+
+        cuts = []
+        opened = []
+        supp_level = self.attacker.supp_level
+        for _ in range(self.alternative_cuts):
+
+            # Open up the unsuppressed cells that the previous constraint relied upon
+            new_cells = [cell for cell in coefficients.keys() if supp_level[cell] < 0.5 and cell not in opened]
+            if not new_cells:
+                break
+            for cell in new_cells:
+                self.attacker.update_cell_bounds(cell, 1)
+            opened += new_cells
+
+            # Read the constraint from the new solution of the attacker problem
+            self.attacker.optimise(sensitive_cell, maximise)
+            self.sub_problem.attacker_solves += 1
+            coefficients, rhs = self.sub_problem.upper_cut(sensitive_cell) if maximise else \
+                self.sub_problem.lower_cut(sensitive_cell)
+            cuts.append(self.tighten(coefficients, rhs) if "tighten" in self.active else (coefficients, rhs))
+            self.stats["alternative constraints"] += 1
+
+        # Restore the bounds of the attacker problem to the current suppression pattern
+        for cell in opened:
+            self.attacker.update_cell_bounds(cell, supp_level[cell])
+
+        return cuts
+
+    def is_violated(self, coefficients, rhs):
+        """Checks whether the current suppression pattern violates the constraint"""
+
+        supp_level = self.attacker.supp_level
+        return sum(value * supp_level[cell] for cell, value in coefficients.items()) < rhs - self.tolerance
+
+    def print_stats(self):
+        """Prints the statistics of each of the steps"""
+
+        for key in sorted(self.stats.keys()):
+            print("{}: {}".format(key, self.stats[key]))
@@ -1,6 +1,8 @@
 from attacker import Attacker
+from components import connected_components
 from collections import defaultdict
 from gurobipy import *
+import time
 
 
 class SubProblem:
@@ -20,10 +22,12 @@ class SubProblem:
     add constraints to the master problem differ slightly as a result so need to be considered explicitly.
     """
 
-    def __init__(self, master, data, callback=False, max_iterations_per_sub_problem=50):
+    def __init__(self, master, data, callback=False, max_iterations_per_sub_problem=50, adaptive=False, decay=0.5):
 
-        # The location of the master problem object is stored so constraints can be added directly as they are found.
+        # The location of the master problem object is stored so constraints can be added directly as they are found. The
+        # master can be None, in which case the constraints are only collected in found_cuts
         self.master = master
+        self.found_cuts = []
 
         # The data and parameters are stored as attributes.
         self.data = data
@@ -49,24 +53,79 @@ class SubProblem:
         self.HIGH = self.default_nominal_dict()
         self.LOW = self.default_nominal_dict()
 
+        # The adaptive scheduler orders the attacker problems by how recently they produced cuts and how thin their margin
+        # is. It also skips attacker problems whose component has only gained suppressions since they were last protected.
+        self.adaptive = adaptive
+        self.decay = decay
+        self.component_of, self.components = find_components(self.data)
+        self.component_patterns = {}
+        self.cut_scores = defaultdict(float)
+        self.last_protected = {}
+
+        # An optional CutStrengthener that constraints are passed through before they are added to the master problem
+        self.strengthener = None
+
+        # An optional AttackerCache that stores the results of attacker problems by the suppression pattern of the component
+        self.cache = None
+
+        # An optional Budget. If it expires the sub-problem stops early and records that it has stopped, in which case the
+        # suppression pattern has not been fully checked
+        self.budget = None
+        self.stopped = False
+
+        # Optional RemoteAttackers that solve the attacker problems on other processes or hosts
+        self.remote = None
+        self.remote_results = {}
+
+        # An optional TraceRecorder that records the outcome of every solve
+        self.recorder = None
+
+        # Counts the number of attacker problems solved and skipped over the life of the object
+        self.attacker_solves = 0
+        self.attacker_skips = 0
+
+    def refresh(self, cells):
+        """Updates the order of the sensitive cells and forgets what is known about the components of a number of cells
+        after the data of the cells has changed. The bounds of the attacker problem are read from the data whenever the
+        suppression pattern changes, so the attacker problem itself does not need to be rebuilt"""
+
+        self.non_increasing_UPL_sensitive_cells = sorted(self.data["sensitive cells"].keys(),
+                                                         key=lambda x: self.data["sensitive cells"][x]["UPL"], reverse=True)
+        self.non_increasing_LPL_sensitive_cells = sorted(self.data["sensitive cells"].keys(),
+                                                         key=lambda x: self.data["sensitive cells"][x]["LPL"], reverse=True)
+
+        # The protections and cached results of the changed components no longer hold
+        changed = set(self.component_of[cell] for cell in cells)
+        for sensitive_cell, maximise in list(self.last_protected.keys()):
+            if self.component_of[sensitive_cell] in changed:
+                del self.last_protected[sensitive_cell, maximise]
+        if self.cache is not None:
+            self.cache.discard(lambda key: self.component_of[key[0]] in changed)
+
     def reset_high_low(self):
         """Reset the HIGH and LOW parameters to their nominal values. This is done between consecutive solves of the
         subproblem in the complete solve mode. It does not need to be performed in the diving heuristic"""
 
         self.HIGH = self.default_nominal_dict()
         self.LOW = self.default_nominal_dict()
+        if self.recorder:
+            self.recorder.record_reset()
 
     def solve(self, reset_model=False, refresh_bounds=True, extended=False):
         """ Refine assumes the first callback is to check the trivial seed solution, and the second callback is to
         check the solution where only primary suppression is completed.
         """
 
+        start = time.time()
+
         # The attacker model is reset between subsequent subproblems iterations but not between individual attacker solvers
         if reset_model:
             self.attacker.m.reset()
 
         # Track how many constraints are added in this subproblem iteration
         self.constraints_added = 0
+        self.found_cuts = []
+        self.stopped = False
 
         # Reset the HIGH and LOW parameters if necessary
         if refresh_bounds:
@@ -77,51 +136,176 @@ class SubProblem:
         self.HIGH_LOW_cells = [cell for cell, supp in self.attacker.supp_level.items() if supp > 0.5] if extended else \
             self.data["sensitive cells"].keys()
 
-        # Solve all the UPL in non-increasing order
-        for sensitive_cell in self.non_increasing_UPL_sensitive_cells:
-            if self.constraints_added <= self.max_constraints_per_iteration:
-                self.process_upper_protection_level(sensitive_cell)
+        # Store the suppressed cells of each component. These are used by the adaptive scheduler to skip attacker problems
+        # and as part of the key of the cache
+        self.component_patterns = {} if not (self.adaptive or self.cache is not None) else \
+            {component: frozenset(cell for cell in cells if self.attacker.supp_level[cell] > 0.5)
+             for component, cells in self.components.items()}
+
+        # When there are remote workers, the attacker problems that need to be solved are sent to them all at once
+        jobs = list(self.schedule())
+        self.remote_results = {}
+        if self.remote is not None:
+            self.remote_results = self.remote.evaluate(self.attacker.supp_level, [
+                (sensitive_cell, maximise) for sensitive_cell, maximise in jobs
+                if self.needs_attack(sensitive_cell, maximise) and
+                not (self.adaptive and not extended and self.known_protected(sensitive_cell, maximise))])
+            self.attacker_solves += len(self.remote_results)
+
+        # Solve the attacker problems in the order given by the scheduler
+        for sensitive_cell, maximise in jobs:
+            if self.constraints_added > self.max_constraints_per_iteration:
+                break
+            if self.budget and self.budget.should_stop():
+                self.stopped = True
+                break
+
+            # The adaptive scheduler skips attacker problems that are known to be protected
+            if self.adaptive and not extended and self.known_protected(sensitive_cell, maximise):
+                self.attacker_skips += 1
+                continue
+
+            if maximise:
+                added = self.process_upper_protection_level(sensitive_cell)
+            else:
+                added = self.process_lower_protection_level(sensitive_cell)
 
-        # Solve all the LPL in non-increasing order
-        for sensitive_cell in self.non_increasing_LPL_sensitive_cells:
-            if self.constraints_added <= self.max_constraints_per_iteration:
-                self.process_lower_protection_level(sensitive_cell)
+            # Record the outcome so the scheduler can use it in later iterations. This is not done in extended mode as
+            # every attacker problem must be solved to track the secondary suppressions
+            if self.adaptive and not extended and added is not None:
+                self.record_outcome(sensitive_cell, maximise, added)
 
-    def process_upper_protection_level(self, sensitive_cell):
-        """Process the upper protection level of a specific sensitive cell. Checks if the attacker problem must be solved and
-        if so solves appropriately and either adds a constraint or updates the HIGH LOW parameter"""
+        if self.recorder:
+            self.recorder.record_solve(self, reset_model, refresh_bounds, extended, time.time() - start)
+
+    def schedule(self):
+        """Yields the (sensitive cell, maximise) pairs in the order they should be processed. By default all the UPL are
+        processed in non-increasing order followed by all the LPL in non-increasing order. The adaptive scheduler instead
+        puts first the attacker problems that produced cuts recently, and then those with the thinnest protection margin"""
+
+        if not self.adaptive:
+            for sensitive_cell in self.non_increasing_UPL_sensitive_cells:
+                yield sensitive_cell, True
+            for sensitive_cell in self.non_increasing_LPL_sensitive_cells:
+                yield sensitive_cell, False
+            return
+
+        # Decay the cut scores so that only recent iterations have a strong influence
+        for key in self.cut_scores.keys():
+            self.cut_scores[key] *= self.decay
+
+        jobs = [(cell, True) for cell in self.non_increasing_UPL_sensitive_cells] + \
+               [(cell, False) for cell in self.non_increasing_LPL_sensitive_cells]
+        for job in sorted(jobs, key=lambda x: (-self.cut_scores[x], self.margin(*x))):
+            yield job
+
+    def margin(self, sensitive_cell, maximise):
+        """The fraction of the protection level already achieved according to the HIGH and LOW parameters"""
 
         cell_nominal = self.data["cells"][sensitive_cell]["nominal"]
-        cell_UPL = self.data["sensitive cells"][sensitive_cell]["UPL"]
+        if maximise:
+            protection_level = self.data["sensitive cells"][sensitive_cell]["UPL"]
+            achieved = self.HIGH[sensitive_cell] - cell_nominal
+        else:
+            protection_level = self.data["sensitive cells"][sensitive_cell]["LPL"]
+            achieved = cell_nominal - self.LOW[sensitive_cell]
+        return achieved / protection_level if protection_level > 0 else 1
 
-        # Checks to see if the limit has not yet been exceeded and if so solves the attacker problem accordingly
-        if self.HIGH[sensitive_cell] < cell_nominal + cell_UPL:
-            y_max = self.attacker.optimise(sensitive_cell, maximise=True)
+    def known_protected(self, sensitive_cell, maximise):
+        """Checks whether the attacker problem was protected for a subset of the current suppressions in its component. The
+        attacker can only do better when more cells are suppressed so the protection still holds"""
 
-            # Either adds a constraint or updates HIGH and LOW
-            if cell_nominal + cell_UPL > y_max:
-                self.add_upper_constraint_to_master(sensitive_cell)
-                self.constraints_added += 1
-            else:
-                self.update_high_low()
+        pattern = self.last_protected.get((sensitive_cell, maximise))
+        current = self.component_patterns.get(self.component_of[sensitive_cell])
+        return pattern is not None and current is not None and pattern <= current
+
+    def record_outcome(self, sensitive_cell, maximise, added):
+        """Updates the cut score of an attacker problem, or remembers the suppressions under which it was protected"""
+
+        if added:
+            self.cut_scores[sensitive_cell, maximise] += 1
+            self.last_protected.pop((sensitive_cell, maximise), None)
+        else:
+            self.last_protected[sensitive_cell, maximise] = self.component_patterns[self.component_of[sensitive_cell]]
+
+    def process_upper_protection_level(self, sensitive_cell):
+        """Process the upper protection level of a specific sensitive cell. Checks if the attacker problem must be solved and
+        if so solves appropriately and either adds a constraint or updates the HIGH LOW parameter. Returns True if a
+        constraint is added, False if the protection level is met and None if no attacker problem is solved"""
+
+        # Checks to see if the limit has not yet been exceeded and if so solves the attacker problem accordingly
+        if self.needs_attack(sensitive_cell, maximise=True):
+            return self.apply_result(sensitive_cell, True, self.attack(sensitive_cell, maximise=True))
 
     def process_lower_protection_level(self, sensitive_cell):
         """Process the lower protection level of a specific sensitive cell. Checks if the attacker problem must be solved and
-               if so solves appropriately and either adds a constraint or updates the HIGH LOW parameter"""
+               if so solves appropriately and either adds a constraint or updates the HIGH LOW parameter. Returns True if a
+               constraint is added, False if the protection level is met and None if no attacker problem is solved"""
+
+        # Checks to see if the limit has not yet been exceeded and if so solves the attacker problem accordingly
+        if self.needs_attack(sensitive_cell, maximise=False):
+            return self.apply_result(sensitive_cell, False, self.attack(sensitive_cell, maximise=False))
+
+    def needs_attack(self, sensitive_cell, maximise):
+        """Checks whether the HIGH (or LOW) parameter has not yet reached the upper (or lower) protection level, in which
+        case the attacker problem must be solved"""
 
         cell_nominal = self.data["cells"][sensitive_cell]["nominal"]
-        cell_LPL = self.data["sensitive cells"][sensitive_cell]["LPL"]
+        if maximise:
+            return self.HIGH[sensitive_cell] < cell_nominal + self.data["sensitive cells"][sensitive_cell]["UPL"]
+        return self.LOW[sensitive_cell] > cell_nominal - self.data["sensitive cells"][sensitive_cell]["LPL"]
+
+    def attack(self, sensitive_cell, maximise):
+        """Solves the attacker problem in a given direction. Returns a dictionary with the optimum, the constraints if the
+        protection level is violated, and otherwise the values of the suppressed cells in the component of the sensitive
+        cell which are used to update HIGH and LOW. If there is a cache the result is looked up there first, and then in
+        the results prefetched from the remote workers"""
+
+        if self.cache is not None:
+            pattern = self.component_patterns[self.component_of[sensitive_cell]]
+            key = (sensitive_cell, maximise, pattern)
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+
+        if (sensitive_cell, maximise) in self.remote_results:
+            result = self.remote_results.pop((sensitive_cell, maximise))
+            if self.cache is not None:
+                self.cache.put(key, result)
+            return result
+
+        optimum = self.attacker.optimise(sensitive_cell, maximise)
+        self.attacker_solves += 1
+
+        if self.is_violated(sensitive_cell, maximise, optimum):
+            result = {"optimum": optimum, "cuts": self.find_cuts(sensitive_cell, maximise), "values": None}
+        else:
+            cells = pattern if self.cache is not None else self.HIGH_LOW_cells
+            result = {"optimum": optimum, "cuts": None, "values": {cell: self.attacker.vars[cell].x for cell in cells}}
 
-        # Checks to see if the limit has not yet been exceeded and if so solves the attacker problem accordingly
-        if self.LOW[sensitive_cell] > cell_nominal - cell_LPL:
-            y_min = self.attacker.optimise(sensitive_cell, maximise=False)
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
 
-            # Either adds a constraint or updates HIGH and LOW
-            if cell_nominal - cell_LPL < y_min:
-                self.add_lower_constraint_to_master(sensitive_cell)
-                self.constraints_added += 1
-            else:
-                self.update_high_low()
+    def is_violated(self, sensitive_cell, maximise, optimum):
+        """Checks whether the optimum of the attacker problem violates the protection level of the sensitive cell"""
+
+        cell_nominal = self.data["cells"][sensitive_cell]["nominal"]
+        if maximise:
+            return cell_nominal + self.data["sensitive cells"][sensitive_cell]["UPL"] > optimum
+        return cell_nominal - self.data["sensitive cells"][sensitive_cell]["LPL"] < optimum
+
+    def apply_result(self, sensitive_cell, maximise, result):
+        """Either adds the constraints of the attacker result to the master problem or updates HIGH and LOW. Returns True
+        if a constraint is added and False otherwise"""
+
+        if result["cuts"] is not None:
+            self.add_cuts_to_master(sensitive_cell, maximise, result["cuts"])
+            self.constraints_added += 1
+            return True
+        else:
+            self.update_high_low(result["values"])
+            return False
 
     def positive_reduced_cost(self):
         """Determines the cells that have a positive reduced cost in the current solution of the attacker problem"""
@@ -136,65 +320,84 @@ class SubProblem:
             if self.attacker.vars[cell].RC < 0:
                 yield cell, abs(self.attacker.vars[cell].RC)
 
-    def add_upper_constraint_to_master(self, sensitive_cell):
-        """Adds a constraint due to the violation of the UPL of specific sensitive cell. This is well explained in the FS paper"""
+    def upper_cut(self, sensitive_cell):
+        """The coefficients and right hand side of the constraint due to the violation of the UPL of a specific sensitive
+        cell, read from the reduced costs of the current solution of the attacker problem. This is well explained in the FS
+        paper"""
 
         protection_limit = self.data["sensitive cells"][sensitive_cell]["UPL"]
+        coefficients = {}
 
-        # The first expression are for cells with positive reduced cost
-        first_expr = LinExpr((min(value * self.data["cells"][cell]["UB"], protection_limit),
-                              self.master.vars[cell]) for cell, value in self.positive_reduced_cost() if
-                             self.data["cells"][cell]["nominal"] != 0)
-
-        # The second expression are for cells with negative reduced cost
-        second_expr = LinExpr((min(value * self.data["cells"][cell]["LB"], protection_limit),
-                               self.master.vars[cell]) for cell, value in self.negative_reduced_cost() if
-                              self.data["cells"][cell]["nominal"] != 0)
-
-        # The functions used to add the constraint are slightly different based on whether its a lazy constraint or not
-        if self.callback:
-            self.master.mdl.cbLazy(
-                first_expr + second_expr >= protection_limit
-            )
-        else:
-            self.master.mdl.addConstr(
-                first_expr + second_expr >= protection_limit, name="lazy_upper_{}".format(sensitive_cell)
-            )
+        # The first coefficients are for cells with positive reduced cost
+        for cell, value in self.positive_reduced_cost():
+            if self.data["cells"][cell]["nominal"] != 0:
+                coefficients[cell] = min(value * self.data["cells"][cell]["UB"], protection_limit)
 
-    def add_lower_constraint_to_master(self, sensitive_cell):
-        """Adds a constraint due to the violation of the LPL of specific sensitive cell. This is well explained in the FS paper"""
+        # The second coefficients are for cells with negative reduced cost
+        for cell, value in self.negative_reduced_cost():
+            if self.data["cells"][cell]["nominal"] != 0:
+                coefficients[cell] = min(value * self.data["cells"][cell]["LB"], protection_limit)
+
+        return coefficients, protection_limit
+
+    def lower_cut(self, sensitive_cell):
+        """The coefficients and right hand side of the constraint due to the violation of the LPL of a specific sensitive
+        cell, read from the reduced costs of the current solution of the attacker problem. This is well explained in the FS
+        paper"""
 
         protect_limit = self.data["sensitive cells"][sensitive_cell]["LPL"]
+        coefficients = {}
 
-        # The first expression are for cells with positive reduced cost
-        first_expr = LinExpr((min(value * self.data["cells"][cell]["LB"], protect_limit),
-                              self.master.vars[cell]) for cell, value in self.positive_reduced_cost())
+        # The first coefficients are for cells with positive reduced cost
+        for cell, value in self.positive_reduced_cost():
+            coefficients[cell] = min(value * self.data["cells"][cell]["LB"], protect_limit)
 
-        # The second expression are for cells with negative reduced cost
-        second_expr = LinExpr((min(value * self.data["cells"][cell]["UB"], protect_limit),
-                               self.master.vars[cell]) for cell, value in self.negative_reduced_cost())
+        # The second coefficients are for cells with negative reduced cost
+        for cell, value in self.negative_reduced_cost():
+            coefficients[cell] = min(value * self.data["cells"][cell]["UB"], protect_limit)
 
-        # The functions used to add the constraint are slightly different based on whether its a lazy constraint or not
-        if self.callback:
-            self.master.mdl.cbLazy(
-                first_expr + second_expr >= protect_limit
-            )
+        return coefficients, protect_limit
 
-        else:
-            self.master.mdl.addConstr(
-                first_expr + second_expr >= protect_limit, name="lazy_lower_{}".format(
-                    sensitive_cell)
-            )
+    def find_cuts(self, sensitive_cell, maximise):
+        """Reads the constraint from the current solution of the attacker problem, and passes it through the cut
+        strengthener if there is one. The strengthener may replace the constraint by several"""
+
+        coefficients, rhs = self.upper_cut(sensitive_cell) if maximise else self.lower_cut(sensitive_cell)
+        if self.strengthener:
+            return self.strengthener.strengthen(sensitive_cell, maximise, coefficients, rhs)
+        return [(coefficients, rhs)]
+
+    def add_cuts_to_master(self, sensitive_cell, maximise, cuts):
+        """Adds a list of (coefficients, rhs) constraints for a specific sensitive cell to the master problem. The
+        constraints are also collected in found_cuts"""
+
+        self.found_cuts.append((sensitive_cell, maximise, cuts))
+        if self.master is None:
+            return
+
+        for coefficients, rhs in cuts:
+            # The functions used to add the constraint are slightly different based on whether its a lazy constraint or not
+            if self.callback:
+                self.master.mdl.cbLazy(
+                    LinExpr((value, self.master.vars[cell]) for cell, value in coefficients.items()) >= rhs
+                )
+            else:
+                self.master.add_cut(sensitive_cell, maximise, coefficients, rhs)
 
-    def update_high_low(self):
-        """Update the HIGH and LOW dictionaries based off allowable solutions to the attacker problem"""
+    def update_high_low(self, values=None):
+        """Update the HIGH and LOW dictionaries based off allowable solutions to the attacker problem. The values of the
+        cells can be given, otherwise they are read from the current solution of the attacker problem"""
 
         for sensitive_cell in self.HIGH_LOW_cells:
-            self.HIGH[sensitive_cell] = max(self.HIGH[sensitive_cell],
-                                            self.attacker.vars[sensitive_cell].x)
+            if values is None:
+                value = self.attacker.vars[sensitive_cell].x
+            elif sensitive_cell in values:
+                value = values[sensitive_cell]
+            else:
+                continue
 
-            self.LOW[sensitive_cell] = min(self.LOW[sensitive_cell],
-                                           self.attacker.vars[sensitive_cell].x)
+            self.HIGH[sensitive_cell] = max(self.HIGH[sensitive_cell], value)
+            self.LOW[sensitive_cell] = min(self.LOW[sensitive_cell], value)
 
     def default_nominal_dict(self):
         """A function to initiate a dictionary to the nominal values. This is probably an unnecessary efficieny improvement"""
@@ -212,3 +415,13 @@ class KeyDependentDict(defaultdict):
         ret = self.f_of_x(key)  # calculate default value
         self[key] = ret  # and install it in the dict
         return ret
+
+
+def find_components(data):
+    """Finds the connected components of the cells, where two cells are connected if they share a relation. The attacker
+    problem of a sensitive cell only depends on the suppression pattern within its component.
+
+    :return: a dictionary from each cell to its component, and a dictionary from each component to its cells
+    """
+
+    return connected_components(data["cells"].keys(), (lhs + rhs for lhs, rhs in data["relations"].values()))
@@ -1,4 +1,8 @@
 from solver import Solver
+from pipeline import AttackerPool
+from remote import RemoteAttackers, LocalWorkers, parse_addresses
+from recorder import TraceRecorder
+from budget import Budget, trivial_bounds
 import read
 import write
 
@@ -8,34 +12,127 @@ def run(my_data, my_args):
 
     :param my_data: returned from read.data(filename)
     :param my_args: returned from read.arguments()
+    :return: a dictionary with the objective and the number of primary, secondary and unsuppressed cells of the solution,
+        and the status of the solver
     """
 
+    # A single budget limits the time of all the phases, and SIGINT or SIGTERM stop the solver early
+    budget = Budget(my_args.deadline)
+    budget.handle_signals()
+    try:
+        supp_level, bounds, solver, status = solve(my_data, my_args, budget)
+
+        # Writes the solution to file.
+        write.solution(my_data, supp_level, bounds, my_args.mode, my_args.output, my_args.threads, my_args.format,
+                       my_args.quiet)
+    finally:
+        budget.restore_signals()
+
+    results = solver.master.results(supp_level)
+    results["status"] = status
+    return results
+
+
+def solve(my_data, my_args, budget):
+    """ Runs the phases of the solver until they finish or the budget expires
+
+    :param my_data: returned from read.data(filename)
+    :param my_args: returned from read.arguments()
+    :param budget: a Budget object
+    :return: the best suppression pattern found, its bounds, the solver, and the status. The status is interrupted if a
+        signal stopped the solver, expired if the deadline cut a phase short, found if a suppression pattern was found
+        together with its bounds, and not found if only the trivial suppression pattern or bounds are available
+    """
+
+    # The worker processes of the pipeline are started before any Gurobi model is built
+    pool = AttackerPool(my_data, my_args.pipeline_workers, my_args.heuristic_constraints) \
+        if my_args.pipeline_workers > 0 else None
+
+    # The local attacker workers are also started before any Gurobi model is built
+    local_workers = LocalWorkers(my_args.remote_local) if my_args.remote_local > 0 else None
+    addresses = parse_addresses(my_args.remote) if my_args.remote else []
+    if local_workers is not None:
+        addresses += local_workers.addresses()
+    strengthen = [step for step in my_args.strengthen.split(",") if step]
+    remote = RemoteAttackers(my_data, addresses, strengthen, my_args.alternative_cuts) if addresses else None
+
     # Creates a solver object and prints the details of the problem
-    solver = Solver(my_data, my_args.ignore_starting_constraints)
+    solver = Solver(my_data, my_args.ignore_starting_constraints, my_args.adaptive_order, strengthen, my_args.alternative_cuts,
+                    my_args.cache_size, pool, my_args.pipeline_violations, my_args.threads, budget, remote)
     solver.master.print_details()
 
-    # Runs the diving heuristic with the specified parameters
-    print("%%%%%%%%%%%%%%%%%%%%%\n  DIVING HEURISTIC\n%%%%%%%%%%%%%%%%%%%%%")
-    solver.solve(max_iterations_per_sub_problem=my_args.heuristic_constraints, time_limit=my_args.heuristic_time,
-                 dummy_multiplier=my_args.multiplier,
-                 gap=my_args.heuristic_gap,
-                 complete=False)
-
-    # Runs the diving heuristic with the specified parameters and prints the results
-    supp_level, bounds = solver.remove_redundant_suppressions()
-    solver.master.print_results()
-
-    # Seeds the complete solver with the solution from the heuristic and executes the solver, if required
-    if my_args.optimise:
-        solver.master.provide_feasible_solution(supp_level)
-        print("%%%%%%%%%%%%%%%%%%%%%\n  OPTIMISING\n%%%%%%%%%%%%%%%%%%%%%")
-        solver.solve(max_iterations_per_sub_problem=my_args.optimise_constraints, time_limit=my_args.optimise_time,
-                     gap=my_args.optimise_gap, dummy_multiplier=1, complete=True)
-        solver.master.print_results()
-
-    # Writes the solution to file.
-    write.solution(my_data, supp_level, bounds, my_args.mode, my_args.output)
-    print("press <ENTER> to finish")
+    # Optionally records every suppression pattern checked by the sub-problem so it can be replayed
+    recorder = TraceRecorder(my_args.trace, my_args.file_name) if my_args.trace else None
+    if recorder is not None:
+        recorder.attach(solver.sub_problem)
+
+    try:
+        # Runs the hypercube engine if required. If its pattern is not feasible the diving heuristic continues from it
+        supp_level = None
+        if my_args.engine == "hypercube":
+            print("%%%%%%%%%%%%%%%%%%%%%\n  HYPERCUBE\n%%%%%%%%%%%%%%%%%%%%%")
+            supp_level = solver.hypercube_solve(my_args.heuristic_constraints, my_args.hypercube_beam)
+        found = supp_level is not None
+
+        # Runs the diving heuristic with the specified parameters
+        if not found:
+            print("%%%%%%%%%%%%%%%%%%%%%\n  DIVING HEURISTIC\n%%%%%%%%%%%%%%%%%%%%%")
+            found = solver.solve(max_iterations_per_sub_problem=my_args.heuristic_constraints,
+                                 time_limit=my_args.heuristic_time,
+                                 dummy_multiplier=my_args.multiplier,
+                                 gap=my_args.heuristic_gap,
+                                 complete=False)
+
+        # The pipeline is only used by the diving heuristic
+        if pool is not None:
+            pool.close()
+            solver.pool = None
+
+        # Prints the results of the heuristic solution and removes its redundant suppressions. If the budget expires the
+        # solution is kept with trivial bounds
+        if found:
+            solver.master.print_results(supp_level)
+            supp_level, bounds = solver.remove_redundant_suppressions(supp_level)
+            solver.incumbent.update(supp_level, solver.master.results(supp_level)["objective"], bounds)
+
+        # Seeds the complete solver with the best solution so far and executes the solver, if required
+        if my_args.optimise and not budget.should_stop():
+            solver.master.provide_feasible_solution(solver.incumbent.supp_levels)
+            print("%%%%%%%%%%%%%%%%%%%%%\n  OPTIMISING\n%%%%%%%%%%%%%%%%%%%%%")
+            solver.solve(max_iterations_per_sub_problem=my_args.optimise_constraints, time_limit=my_args.optimise_time,
+                         gap=my_args.optimise_gap, dummy_multiplier=1, complete=True)
+            if solver.master.mdl.SolCount > 0:
+                solver.master.print_results()
+
+            # The complete solve may improve the incumbent, in which case its redundancies are removed
+            if solver.incumbent.bounds is None:
+                supp_level, bounds = solver.remove_redundant_suppressions(solver.incumbent.supp_levels)
+                solver.incumbent.update(supp_level, solver.master.results(supp_level)["objective"], bounds)
+
+        # Without time to compute the bounds, the trivial bounds are used
+        found = solver.incumbent.bounds is not None
+        if not found:
+            print("Writing the best solution found so far with objective {}".format(solver.incumbent.objective))
+            solver.incumbent.bounds = trivial_bounds(my_data, solver.incumbent.supp_levels)
+    finally:
+
+        # The trace, the pipeline and the attacker workers are closed even if a phase fails, so that the trace is complete
+        # up to the failure and no worker processes are left behind
+        if recorder is not None:
+            recorder.close()
+        if solver.pool is not None:
+            solver.pool.close()
+            solver.pool = None
+        if remote is not None:
+            remote.close()
+            solver.sub_problem.remote = None
+        if local_workers is not None:
+            local_workers.close()
+
+    status = budget.status(found)
+    print("Status: {}".format(status))
+
+    return solver.incumbent.supp_levels, solver.incumbent.bounds, solver, status
 
 
 if __name__ == "__main__":
@@ -44,3 +141,4 @@ if __name__ == "__main__":
     args = read.arguments()
     data = read.data(args.file_name)
     run(data, args)
+    print("press <ENTER> to finish")
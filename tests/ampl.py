@@ -0,0 +1,32 @@
+import os
+
+# A 2x2 table with row, column and grand totals in the AMPL format read by read.files. The first and last line of both
+# files are skipped by the reader
+CELLS = [("c11", 20, 1), ("c12", 30, 0), ("c1T", 50, 0),
+         ("c21", 25, 0), ("c22", 35, 0), ("c2T", 60, 0),
+         ("cT1", 45, 0), ("cT2", 65, 0), ("cTT", 110, 0)]
+
+RELATIONS = [("r1", ["c11", "c12"], "c1T"), ("r2", ["c21", "c22"], "c2T"), ("rT", ["cT1", "cT2"], "cTT"),
+             ("k1", ["c11", "c21"], "cT1"), ("k2", ["c12", "c22"], "cT2"), ("kT", ["c1T", "c2T"], "cTT")]
+
+
+def write_table(directory):
+    """Writes the cell and relation files of the table to a directory and returns their paths"""
+
+    cell_file = os.path.join(directory, "cells.dat")
+    with open(cell_file, "w") as f:
+        f.write("param: cell nominal sensitive :=\n")
+        for cell, nominal, sensitive in CELLS:
+            f.write("{} {} {}\n".format(cell, nominal, sensitive))
+        f.write(";\n")
+
+    relation_file = os.path.join(directory, "relations.dat")
+    with open(relation_file, "w") as f:
+        f.write("param: relation cell coefficient :=\n")
+        for relation, lhs, total in RELATIONS:
+            for cell in lhs:
+                f.write("{} {} 1\n".format(relation, cell))
+            f.write("{} {} -1\n".format(relation, total))
+        f.write(";\n")
+
+    return cell_file, relation_file
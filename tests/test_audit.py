@@ -0,0 +1,73 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class AuditArgumentsTest(unittest.TestCase):
+
+    def arguments(self, argv):
+        import audit
+        previous = sys.argv
+        sys.argv = ["audit.py"] + argv
+        try:
+            return audit.arguments()
+        finally:
+            sys.argv = previous
+
+    def test_ampl_relations_cannot_be_used_with_a_manifest(self):
+        self.assertRaises(SystemExit, self.arguments, ["tables.txt", "--manifest", "--ampl_relations", "relations.dat"])
+
+    def test_manifest_without_pattern(self):
+        args = self.arguments(["tables.txt", "--manifest", "--chunk_size", "8"])
+        self.assertTrue(args.manifest)
+        self.assertEqual(args.chunk_size, 8)
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class AuditFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_manifest_job_uses_the_chunk_size(self):
+        from budget import trivial_bounds
+        import audit
+        import read
+        import write
+        file_name = os.path.join(ROOT, "example.csp")
+        data = read.data(file_name)
+
+        # Suppressing every cell with a non-zero nominal protects every sensitive cell
+        supp_levels = {cell: 0 if info["nominal"] == 0 else 1 for cell, info in data["cells"].items()}
+        pattern_file = os.path.join(self.directory, "pattern.csv")
+        write.solution(data, supp_levels, trivial_bounds(data, supp_levels), 0, pattern_file, quiet=True)
+
+        for chunk_size in (1, 64):
+            summary = audit.audit_file((file_name, pattern_file, 1e-6, chunk_size))
+            self.assertEqual(summary["checked"], 2 * len(data["sensitive cells"]))
+            self.assertEqual(summary["violations"], [])
+
+    def test_chunks_respect_the_chunk_size(self):
+        import audit
+        import read
+        data = read.data(os.path.join(ROOT, "example.csp"))
+        for chunk in audit.chunks(data, 3):
+            self.assertLessEqual(len(chunk), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class CheckModelTest(unittest.TestCase):
+
+    def model(self, pipeline_stop=False, budget_stop=False):
+        from gurobipy import GRB
+
+        class StoppedModel:
+            status = GRB.INTERRUPTED
+            _pipeline_stop = pipeline_stop
+            _budget_stop = budget_stop
+
+        return StoppedModel()
+
+    def test_interrupted_model_marks_budget_interrupted(self):
+        from budget import Budget
+        budget = Budget()
+        budget.check_model(self.model())
+        self.assertTrue(budget.interrupted)
+
+    def test_pipeline_stop_is_not_an_interruption(self):
+        from budget import Budget
+        budget = Budget()
+        budget.check_model(self.model(pipeline_stop=True))
+        self.assertFalse(budget.interrupted)
+
+    def test_budget_stop_is_not_an_interruption(self):
+        from budget import Budget
+        budget = Budget()
+        budget.check_model(self.model(budget_stop=True))
+        self.assertFalse(budget.interrupted)
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class StatusTest(unittest.TestCase):
+
+    def test_finishing_inside_the_reserve_is_not_expired(self):
+        from budget import Budget
+        budget = Budget(deadline=10)
+        budget.start -= 9.5
+        self.assertTrue(budget.expired())
+        self.assertEqual(budget.status(True), "found")
+        self.assertEqual(budget.status(False), "not found")
+
+    def test_phase_cut_short_is_expired(self):
+        from budget import Budget
+        budget = Budget(deadline=10)
+        budget.start -= 9.5
+        self.assertTrue(budget.should_stop())
+        self.assertEqual(budget.status(True), "expired")
+
+    def test_unexpired_budget_does_not_stop(self):
+        from budget import Budget
+        budget = Budget(deadline=10)
+        self.assertFalse(budget.should_stop())
+        self.assertEqual(budget.status(True), "found")
+
+    def test_signal_is_interrupted(self):
+        from budget import Budget
+        budget = Budget()
+        budget.interrupted = True
+        self.assertTrue(budget.should_stop())
+        self.assertEqual(budget.status(True), "interrupted")
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class PipelinedDiveTest(unittest.TestCase):
+
+    def test_pipelined_dive_does_not_interrupt_budget(self):
+        from pipeline import AttackerPool
+        from solver import Solver
+        from budget import Budget
+        import read
+
+        # Stopping after every violation makes the pipeline terminate the master problem as often as possible
+        data = read.data(os.path.join(ROOT, "example.csp"))
+        pool = AttackerPool(data, 2)
+        try:
+            budget = Budget()
+            solver = Solver(data, pool=pool, pipeline_violations=1, budget=budget)
+            found = solver.solve(max_iterations_per_sub_problem=50, time_limit=1, dummy_multiplier=1, gap=0,
+                                 complete=False)
+        finally:
+            pool.close()
+
+        self.assertFalse(budget.interrupted)
+        self.assertTrue(found)
+
+
+if __name__ == "__main__":
+    unittest.main()
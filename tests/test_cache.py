@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from cache import AttackerCache
+
+
+def key(sensitive_cell, maximise=True, suppressed=(1, 2)):
+    return sensitive_cell, maximise, frozenset(suppressed)
+
+
+class AttackerCacheTest(unittest.TestCase):
+
+    def test_hits_and_misses_are_counted(self):
+        cache = AttackerCache(4)
+        self.assertIsNone(cache.get(key(1)))
+        cache.put(key(1), {"optimum": 10})
+        self.assertEqual(cache.get(key(1)), {"optimum": 10})
+        self.assertEqual(cache.get(key(1)), {"optimum": 10})
+        self.assertIsNone(cache.get(key(2)))
+
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 2)
+
+    def test_keys_differ_by_direction_and_pattern(self):
+        cache = AttackerCache(4)
+        cache.put(key(1), "upper")
+        self.assertIsNone(cache.get(key(1, maximise=False)))
+        self.assertIsNone(cache.get(key(1, suppressed=(1, 3))))
+        self.assertEqual(cache.get(key(1, suppressed=(2, 1))), "upper")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = AttackerCache(3)
+        for cell in (1, 2, 3):
+            cache.put(key(cell), cell)
+
+        # Using 1 makes 2 the least recently used
+        cache.get(key(1))
+        cache.put(key(4), 4)
+
+        self.assertEqual(len(cache.results), 3)
+        self.assertIsNone(cache.get(key(2)))
+        for cell in (1, 3, 4):
+            self.assertEqual(cache.get(key(cell)), cell)
+
+    def test_eviction_order_follows_use(self):
+        cache = AttackerCache(2)
+        cache.put(key(1), 1)
+        cache.put(key(2), 2)
+        cache.get(key(1))
+        cache.put(key(3), 3)
+        cache.get(key(1))
+        cache.put(key(4), 4)
+
+        self.assertEqual(list(cache.results.keys()), [key(1), key(4)])
+
+    def test_put_of_a_stored_key_counts_as_a_use(self):
+        cache = AttackerCache(2)
+        cache.put(key(1), 1)
+        cache.put(key(2), 2)
+        cache.put(key(1), 10)
+        cache.put(key(3), 3)
+
+        self.assertIsNone(cache.get(key(2)))
+        self.assertEqual(cache.get(key(1)), 10)
+
+    def test_discard_removes_invalid_keys(self):
+        cache = AttackerCache(4)
+        for cell in (1, 2, 3):
+            cache.put(key(cell), cell)
+        cache.discard(lambda stored: stored[0] in (1, 3))
+
+        self.assertEqual(list(cache.results.keys()), [key(2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
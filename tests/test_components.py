@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from components import connected_components
+
+
+class ConnectedComponentsTest(unittest.TestCase):
+
+    def test_groups_merge_components(self):
+        component_of, components = connected_components(range(6), [[0, 1], [2, 3], [1, 2], [4]])
+
+        self.assertEqual(len(components), 3)
+        self.assertEqual(len(set(component_of[cell] for cell in (0, 1, 2, 3))), 1)
+        self.assertEqual(sorted(components[component_of[0]]), [0, 1, 2, 3])
+        self.assertEqual(components[component_of[4]], [4])
+        self.assertEqual(components[component_of[5]], [5])
+
+    def test_cells_outside_the_set_do_not_connect(self):
+        component_of, components = connected_components([0, 1, 2], [[0, 9, 1], [2, 9]])
+
+        self.assertNotIn(9, component_of)
+        self.assertEqual(component_of[0], component_of[1])
+        self.assertNotEqual(component_of[0], component_of[2])
+
+    def test_every_cell_is_in_exactly_one_component(self):
+        groups = [[i, (i * 7) % 50] for i in range(50)]
+        component_of, components = connected_components(range(50), groups)
+
+        self.assertEqual(sorted(cell for cells in components.values() for cell in cells), list(range(50)))
+        for component, cells in components.items():
+            for cell in cells:
+                self.assertEqual(component_of[cell], component)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class ConsistentSolutionTest(unittest.TestCase):
+
+    def solve(self, threads):
+        from consistent import find_most_central_consistent_solution
+        from budget import trivial_bounds
+        import read
+        data = read.data(os.path.join(ROOT, "example.csp"))
+
+        # Every other cell is published so that the free cells fall into several components
+        supp_levels = {cell: 1 if info["sensitive"] or i % 2 else 0 for i, (cell, info) in enumerate(data["cells"].items())}
+        find_most_central_consistent_solution(data, trivial_bounds(data, supp_levels), threads)
+        return data
+
+    def test_threads_give_a_consistent_solution(self):
+        data = self.solve(4)
+        for lhs, rhs in data["relations"].values():
+            self.assertAlmostEqual(sum(data["cells"][cell]["new_nominal"] for cell in lhs),
+                                   sum(data["cells"][cell]["new_nominal"] for cell in rhs))
+
+    def test_threads_match_a_single_thread(self):
+        single, threaded = self.solve(1), self.solve(4)
+        for cell, info in single["cells"].items():
+            self.assertAlmostEqual(info["new_diff"], threaded["cells"][cell]["new_diff"])
+
+    def test_repeated_threaded_solves(self):
+
+        # The environments of the threads are disposed after every solve, so repeated solves do not run out of licenses
+        for _ in range(5):
+            self.solve(4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import itertools
+import os
+import sys
+import time
+import unittest
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def table(size, dimensions, sensitive=()):
+    """Builds a table of the given number of dimensions with size cells and a total along each of them. Cells are tuples
+    of their coordinates, where the coordinate size is the total"""
+
+    data = {"cells": {}, "relations": defaultdict(lambda: ([], [])), "sensitive cells": {}}
+    for cell in itertools.product(range(size + 1), repeat=dimensions):
+        nominal = 10 * (size + 1) ** sum(1 for coordinate in cell if coordinate == size)
+        data["cells"][cell] = {"nominal": nominal, "weight": nominal, "lb": 0, "ub": 2 * nominal, "LB": nominal,
+                               "UB": nominal, "sensitive": cell in sensitive}
+        for axis in range(dimensions):
+            if cell[axis] == size:
+                lhs = [cell[:axis] + (coordinate,) + cell[axis + 1:] for coordinate in range(size)]
+                data["relations"][(axis, cell)] = (lhs, [cell])
+
+    for cell in sensitive:
+        data["sensitive cells"][cell] = {"UPL": 2, "LPL": 2}
+    return data
+
+
+def unprotected_relations(data, cells):
+    """The relations that contain exactly one of the cells, which could then be computed from the other cells"""
+
+    return [relation for relation, (lhs, rhs) in data["relations"].items() if len(set(lhs + rhs) & set(cells)) == 1]
+
+
+@unittest.skipIf(np is None, "requires NumPy")
+class FindHypercubeTest(unittest.TestCase):
+
+    def find(self, data, cell):
+        from hypercube import TableStructure, find_hypercube
+        structure = TableStructure(data)
+        suppressed = np.zeros(len(structure.cells), dtype=bool)
+        cube = find_hypercube(structure, structure.index[cell], 2, 2, suppressed)
+        self.assertIsNotNone(cube)
+        return structure, cube
+
+    def test_two_dimensions_give_a_rectangle(self):
+        data = table(4, 2, [(1, 2)])
+        structure, cube = self.find(data, (1, 2))
+
+        cells = [structure.cells[i] for i in cube]
+        self.assertEqual(len(cells), 4)
+        self.assertIn((1, 2), cells)
+        self.assertEqual(unprotected_relations(data, cells), [])
+
+    def test_three_dimensions_give_a_cube(self):
+        data = table(3, 3, [(0, 1, 2)])
+        structure, cube = self.find(data, (0, 1, 2))
+
+        cells = [structure.cells[i] for i in cube]
+        self.assertEqual(len(cells), 8)
+        self.assertIn((0, 1, 2), cells)
+        self.assertEqual(unprotected_relations(data, cells), [])
+
+
+@unittest.skipIf(np is None, "requires NumPy")
+class ProtectTest(unittest.TestCase):
+
+    def test_example_is_protected(self):
+        from hypercube import protect
+        import read
+        data = read.data(os.path.join(ROOT, "example.csp"))
+        pattern, unprotected = protect(data)
+
+        self.assertEqual(unprotected, [])
+        for cell in data["sensitive cells"].keys():
+            self.assertEqual(pattern[cell], 1)
+
+    def test_large_table_is_protected_quickly(self):
+        from hypercube import protect
+        sensitive = [(row, (7 * row) % 80) for row in range(80)]
+        data = table(80, 2, sensitive)
+
+        # An 81 x 81 table with 80 sensitive cells takes a fraction of a second. The limit is generous so that it only
+        # catches a large slowdown of the search
+        start = time.time()
+        pattern, unprotected = protect(data)
+        self.assertLess(time.time() - start, 30)
+
+        self.assertEqual(unprotected, [])
+        self.assertEqual(unprotected_relations(data, [cell for cell, supp in pattern.items() if supp]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import read
+import ampl
+
+
+class FilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_files_stores_the_same_extra_info_as_data(self):
+        data = read.files(*ampl.write_table(self.directory))
+
+        self.assertEqual(len(data["cells"]), 9)
+        self.assertEqual(sorted(data["sensitive cells"].keys()), ["c11"])
+        self.assertEqual(data["num_relations"], 6)
+        self.assertEqual(data["num_nz"], 9)
+        self.assertEqual(data["relations"]["r1"], (["c11", "c12"], ["c1T"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from recorder import TraceRecorder, events, apply_delta
+
+
+class StubSubProblem:
+    """The attributes of a sub-problem that record_solve reads"""
+
+    def __init__(self, data):
+        self.data = data
+        self.HIGH_LOW_cells = list(data["cells"].keys())
+        self.max_constraints_per_iteration = 50
+        self.found_cuts = []
+        self.HIGH = {cell: info["nominal"] for cell, info in data["cells"].items()}
+        self.LOW = dict(self.HIGH)
+        self.stopped = False
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.trace_file = os.path.join(self.directory, "run.trace.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def replay_patterns(self, cells):
+        """Rebuilds the suppression pattern of every pattern event, as replay.py does, and lists the other events"""
+
+        ids = {str(cell): cell for cell in cells}
+        supp_level = {cell: 0 for cell in cells}
+        patterns, other = [], []
+        for event in events(self.trace_file):
+            if event["type"] == "pattern":
+                apply_delta(supp_level, event["delta"], ids)
+                patterns.append(dict(supp_level))
+            else:
+                other.append(event["type"])
+        return patterns, other
+
+    def check_round_trip(self, cells):
+        recorded = [{cell: 0 for cell in cells},
+                    {cell: 1 if i % 2 else 0 for i, cell in enumerate(cells)},
+                    {cell: 1 for cell in cells},
+                    {cell: 1 if i == 0 else 0 for i, cell in enumerate(cells)}]
+
+        recorder = TraceRecorder(self.trace_file, "table.csp")
+        recorder.record_reset()
+        for supp_level in recorded:
+            recorder.record_pattern(supp_level)
+        recorder.record_reset()
+        recorder.close()
+
+        patterns, other = self.replay_patterns(cells)
+        self.assertEqual(patterns, recorded)
+        self.assertEqual(other, ["header", "reset", "reset"])
+
+    def test_integer_cells(self):
+        self.check_round_trip(list(range(10)))
+
+    def test_string_cells(self):
+        self.check_round_trip(["c11", "c12", "c1T", "10", "x y"])
+
+    def test_header(self):
+        TraceRecorder(self.trace_file, "table.csp").close()
+        self.assertEqual(list(events(self.trace_file)), [{"type": "header", "file_name": "table.csp"}])
+
+    def test_only_changed_cells_are_recorded(self):
+        recorder = TraceRecorder(self.trace_file)
+        recorder.record_pattern({1: 0, 2: 1, 3: 1})
+        recorder.record_pattern({1: 0, 2: 1, 3: 0})
+        recorder.record_pattern({1: 0, 2: 1, 3: 0})
+        recorder.close()
+
+        deltas = [sorted(event["delta"]) for event in events(self.trace_file) if event["type"] == "pattern"]
+        self.assertEqual(deltas, [[[2, 1], [3, 1]], [[3, 0]], []])
+
+    def test_solve(self):
+        data = {"cells": {1: {"nominal": 10}, 2: {"nominal": 20}, 3: {"nominal": 30}}}
+        sub_problem = StubSubProblem(data)
+        sub_problem.found_cuts = [(1, True, [({2: 5.0, 3: 2.5}, 5.0)])]
+        sub_problem.HIGH[1] = 12
+
+        recorder = TraceRecorder(self.trace_file)
+        recorder.record_solve(sub_problem, False, True, False, 0.5)
+        recorder.close()
+
+        solve = [event for event in events(self.trace_file) if event["type"] == "solve"][0]
+        self.assertEqual(solve["high"], [[1, 12]])
+        self.assertEqual(solve["low"], [])
+        self.assertEqual(solve["max_constraints"], 50)
+        sensitive_cell, maximise, cuts = solve["cuts"][0]
+        self.assertEqual((sensitive_cell, maximise), (1, True))
+        self.assertEqual([(dict(coefficients), rhs) for coefficients, rhs in cuts], [({2: 5.0, 3: 2.5}, 5.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class AttackerWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        import read
+        self.data = read.data(os.path.join(ROOT, "example.csp"))
+
+    def handle(self, worker, message):
+        """Passes the message through JSON, as it would be sent over the network"""
+
+        return worker.handle(json.loads(json.dumps(message)))
+
+    def test_worker_strengthens_the_constraints(self):
+        from remote import AttackerWorker, encode_data
+        from strengthen import CutStrengthener
+        worker = AttackerWorker()
+        self.handle(worker, {"op": "load", "data": encode_data(self.data), "strengthen": ["tighten"], "alternative_cuts": 2})
+        self.assertIsInstance(worker.sub_problem.strengthener, CutStrengthener)
+
+        # Without any suppressions every protection level is violated, and tightened constraints have no sensitive cells
+        sensitive_cell = sorted(self.data["sensitive cells"].keys())[0]
+        results = self.handle(worker, {"op": "check", "delta": [], "jobs": [[sensitive_cell, True]]})["results"]
+        _, _, _, cuts, _ = results[0]
+        self.assertTrue(cuts)
+        for coefficients, rhs in cuts:
+            for cell, value in coefficients:
+                self.assertFalse(self.data["cells"][cell]["sensitive"])
+
+    def test_worker_without_steps_does_not_strengthen(self):
+        from remote import AttackerWorker, encode_data
+        worker = AttackerWorker()
+        self.handle(worker, {"op": "load", "data": encode_data(self.data)})
+        self.assertIsNone(worker.sub_problem.strengthener)
+
+    def test_unknown_step_is_rejected_before_connecting(self):
+        from remote import RemoteAttackers
+        self.assertRaises(ValueError, RemoteAttackers, self.data, [("127.0.0.1", 1)], ["unknown"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ampl
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+
+@unittest.skipIf(gurobipy is None, "requires Gurobi")
+class ServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load_and_solve_ampl_table(self):
+        from service import SuppressionService
+        cell_file, relation_file = ampl.write_table(self.directory)
+
+        service = SuppressionService()
+        loaded = service.handle({"op": "load", "table": "ampl", "file_name": cell_file, "ampl_relations": relation_file})
+        self.assertEqual(loaded["cells"], 9)
+        self.assertEqual(loaded["sensitive"], 1)
+
+        answer = service.handle({"op": "solve", "table": "ampl", "heuristic_time": 5})
+        self.assertTrue(answer["found"])
+
+        # The sensitive cell of a 2x2 table is protected by suppressing the corners of a rectangle
+        suppressed = [cell for cell, _, _ in answer["suppressed"]]
+        self.assertIn("c11", suppressed)
+        self.assertGreaterEqual(len(suppressed), 4)
+
+
+    def test_invalid_updates_are_rejected(self):
+        from service import SuppressionService
+        import read
+        data = read.data(os.path.join(ROOT, "example.csp"))
+        zero = sorted(cell for cell, info in data["cells"].items() if info["nominal"] == 0)[0]
+        published = sorted(cell for cell, info in data["cells"].items() if info["nominal"] != 0 and not info["sensitive"])[0]
+        nominal = data["cells"][published]["nominal"]
+
+        service = SuppressionService()
+        service.handle({"op": "load", "table": "example", "file_name": os.path.join(ROOT, "example.csp")})
+        for change in ({"cell": zero, "sensitive": True},
+                       {"cell": published, "lb": nominal + 1},
+                       {"cell": published, "ub": nominal - 1}):
+            self.assertRaises(ValueError, service.handle, {"op": "update", "table": "example", "cells": [change]})
+
+        # Nothing is changed by a rejected update
+        info = service.tables["example"].data["cells"]
+        self.assertFalse(info[zero]["sensitive"])
+        self.assertEqual(info[published]["lb"], data["cells"][published]["lb"])
+        self.assertEqual(info[published]["ub"], data["cells"][published]["ub"])
+
+
+if __name__ == "__main__":
+    unittest.main()
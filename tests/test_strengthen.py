@@ -0,0 +1,123 @@
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from strengthen import CutStrengthener
+
+
+class PatternOnly:
+    """Holds only the suppression pattern, which is all the check step reads from the attacker problem"""
+
+    def __init__(self, supp_level):
+        self.supp_level = supp_level
+
+
+class StubSubProblem:
+    """A sub-problem with the data of a few cells and no attacker problem. s is sensitive and z is a structural zero"""
+
+    def __init__(self, supp_level=None):
+        self.data = {"cells": {"s": {"nominal": 10, "sensitive": True},
+                               "a": {"nominal": 20, "sensitive": False},
+                               "b": {"nominal": 30, "sensitive": False},
+                               "c": {"nominal": 40, "sensitive": False},
+                               "z": {"nominal": 0, "sensitive": False}}}
+        self.attacker = None if supp_level is None else PatternOnly(supp_level)
+
+
+class FixedAlternatives(CutStrengthener):
+    """Returns the given alternative constraints instead of re-solving the attacker problem"""
+
+    def __init__(self, sub_problem, steps, cuts):
+        CutStrengthener.__init__(self, sub_problem, steps)
+        self.cuts = cuts
+
+    def alternatives(self, sensitive_cell, maximise, coefficients):
+        return self.cuts
+
+
+class TightenTest(unittest.TestCase):
+
+    def test_sensitive_cells_move_to_the_right_hand_side(self):
+        strengthener = CutStrengthener(StubSubProblem(), ["tighten"])
+        coefficients, rhs = strengthener.tighten({"s": 4, "a": 3, "b": 2}, 10)
+
+        self.assertEqual(rhs, 6)
+        self.assertEqual(coefficients, {"a": 3, "b": 2})
+        self.assertEqual(strengthener.stats["rhs reduction"], 4)
+
+    def test_coefficients_are_capped_at_the_right_hand_side(self):
+        strengthener = CutStrengthener(StubSubProblem(), ["tighten"])
+        coefficients, rhs = strengthener.tighten({"s": 2, "a": 15, "b": 5}, 10)
+
+        self.assertEqual(rhs, 8)
+        self.assertEqual(coefficients, {"a": 8, "b": 5})
+        self.assertEqual(strengthener.stats["coefficients tightened"], 1)
+
+    def test_structural_zeros_and_zero_coefficients_are_dropped(self):
+        strengthener = CutStrengthener(StubSubProblem(), ["tighten"])
+        coefficients, rhs = strengthener.tighten({"a": 3, "b": 0, "z": 5}, 4)
+
+        self.assertEqual(rhs, 4)
+        self.assertEqual(coefficients, {"a": 3})
+
+    def test_constraint_covered_by_sensitive_cells_has_no_right_hand_side_left(self):
+        strengthener = CutStrengthener(StubSubProblem(), ["tighten"])
+        coefficients, rhs = strengthener.tighten({"s": 10, "a": 3}, 8)
+
+        self.assertEqual(rhs, -2)
+
+
+class StrengthenTest(unittest.TestCase):
+
+    def test_unknown_step_is_rejected(self):
+        self.assertRaises(ValueError, CutStrengthener, StubSubProblem(), ["tighten", "unknown"])
+
+    def test_only_tighten(self):
+        strengthener = CutStrengthener(StubSubProblem(), ["tighten"])
+        cuts = strengthener.strengthen("s", True, {"s": 2, "a": 15}, 10)
+
+        self.assertEqual(cuts, [({"a": 8}, 8)])
+        self.assertEqual(strengthener.stats["constraints"], 1)
+        self.assertEqual(strengthener.stats["added"], 1)
+
+    def test_without_steps_the_constraint_is_unchanged(self):
+        strengthener = CutStrengthener(StubSubProblem(), [])
+        self.assertEqual(strengthener.strengthen("s", True, {"s": 2, "a": 15}, 10), [({"s": 2, "a": 15}, 10)])
+
+    def test_duplicate_and_redundant_alternatives_are_dropped(self):
+        alternatives = [({"a": 8}, 8),      # the same as the original constraint
+                        ({"b": 3}, 0),      # nothing left on the right hand side
+                        ({"c": 1e-9}, 1e-9),
+                        ({"b": 5}, 5)]
+        strengthener = FixedAlternatives(StubSubProblem(), ["tighten", "alternative"], alternatives)
+        cuts = strengthener.strengthen("s", True, {"s": 2, "a": 15}, 10)
+
+        self.assertEqual(cuts, [({"a": 8}, 8), ({"b": 5}, 5)])
+        self.assertEqual(strengthener.stats["duplicate"], 1)
+        self.assertEqual(strengthener.stats["redundant"], 2)
+        self.assertEqual(strengthener.stats["added"], 2)
+
+    def test_alternative_covered_by_sensitive_cells_is_redundant(self):
+        strengthener = FixedAlternatives(StubSubProblem(), ["tighten", "alternative"], [])
+        strengthener.cuts = [strengthener.tighten({"s": 10, "a": 3}, 8)]
+        cuts = strengthener.strengthen("s", True, {"s": 2, "a": 15}, 10)
+
+        self.assertEqual(cuts, [({"a": 8}, 8)])
+        self.assertEqual(strengthener.stats["redundant"], 1)
+
+    def test_check_drops_alternatives_that_are_not_violated(self):
+        pattern = {"s": 1, "a": 0, "b": 1, "c": 0, "z": 0}
+        alternatives = [({"b": 5}, 5),      # b is suppressed so the constraint holds
+                        ({"c": 5}, 5)]
+        strengthener = FixedAlternatives(StubSubProblem(pattern), ["alternative", "check"], alternatives)
+        cuts = strengthener.strengthen("s", True, {"a": 5}, 5)
+
+        self.assertEqual(cuts, [({"a": 5}, 5), ({"c": 5}, 5)])
+        self.assertEqual(strengthener.stats["not violated"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import read
+import write
+
+try:
+    import gurobipy
+except ImportError:
+    gurobipy = None
+
+FORMATS = {"csv": ".csv", "jsonl": ".jsonl", "columnar": ".col"}
+
+
+class RoundTripTest(unittest.TestCase):
+    """Every output of write.solution is read back by read.pattern as the same suppression pattern"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.data = read.data(os.path.join(ROOT, "example.csp"))
+
+        # The sensitive cells and every third other cell with a non-zero nominal are suppressed
+        self.supp_levels = {cell: 1 if info["sensitive"] or (info["nominal"] != 0 and cell % 3 == 0) else 0
+                            for cell, info in self.data["cells"].items()}
+        self.bounds = {cell: (info["nominal"] - info["LB"], info["nominal"] + info["UB"]) if self.supp_levels[cell] else
+                       (info["nominal"], info["nominal"]) for cell, info in self.data["cells"].items()}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def round_trip(self, mode, output_format):
+        output_file = os.path.join(self.directory, "mode{}{}".format(mode, FORMATS[output_format]))
+        write.solution(self.data, self.supp_levels, self.bounds, mode, output_file, output_format=output_format,
+                       quiet=True)
+        self.assertEqual(read.pattern(output_file, self.data), self.supp_levels)
+        return output_file
+
+    def test_mode_0(self):
+        for output_format in FORMATS.keys():
+            self.round_trip(0, output_format)
+
+    def test_mode_1(self):
+        for output_format in FORMATS.keys():
+            self.round_trip(1, output_format)
+
+    @unittest.skipIf(gurobipy is None, "requires Gurobi")
+    def test_mode_2(self):
+        for output_format in FORMATS.keys():
+            self.round_trip(2, output_format)
+
+    def test_format_is_inferred_from_the_extension(self):
+        for output_format, extension in FORMATS.items():
+            output_file = os.path.join(self.directory, "inferred" + extension)
+            write.solution(self.data, self.supp_levels, self.bounds, 1, output_file, quiet=True)
+            self.assertEqual(read.pattern(output_file, self.data), self.supp_levels)
+
+    def test_columnar_values_match_the_rows(self):
+        output_file = self.round_trip(1, "columnar")
+        expected = {row["cell"]: row for row in write.rows(self.data, self.supp_levels, self.bounds, 1, quiet=True)}
+
+        rows = list(read.columnar(output_file))
+        self.assertEqual(len(rows), len(expected))
+        for row in rows:
+            self.assertEqual(row["published_lower_bound"], expected[row["cell"]]["published_lower_bound"])
+            self.assertEqual(row["published_upper_bound"], expected[row["cell"]]["published_upper_bound"])
+            self.assertEqual(row["suppressed"], int(expected[row["cell"]]["suppressed"]))
+            self.assertEqual(row["sensitive"], 1 if expected[row["cell"]]["sensitive"] else 0)
+
+    def test_columnar_blocks(self):
+
+        # A small block size splits the rows over several blocks
+        output_file = os.path.join(self.directory, "blocks.col")
+        writer = write.ColumnarWriter(output_file, 0, block_size=7)
+        for row in write.rows(self.data, self.supp_levels, self.bounds, 0, quiet=True):
+            writer.write(row)
+        writer.close()
+        self.assertEqual(read.pattern(output_file, self.data), self.supp_levels)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,73 +1,193 @@
-from consistent import find_most_central_consistent_solution
+from array import array
+import struct
+import json
 import csv
+import sys
 
+# The column headers and the array type code used by the columnar format for each mode
+COLUMNS = {0: [("cell", "i"), ("publication", "d"), ("sensitive", "B")],
+           1: [("cell", "i"), ("published_lower_bound", "d"), ("published_upper_bound", "d"), ("suppressed", "B"),
+               ("sensitive", "B")],
+           2: [("cell", "i"), ("published nominal", "d"), ("published error", "d"), ("suppressed", "B"),
+               ("sensitive", "B")]}
 
-def solution(data, supp_levels, bounds, mode, output_file):
-    """Prints the results in the specified format (mode). If an output_file is specified it is stored there"""
+# The first line of a file in the columnar format
+COLUMNAR_MAGIC = b"SUPPCOL1\n"
 
-    # Sensitive cells are given an * in the output
-    sensitive = {cell: "*" if info["sensitive"] else "" for cell, info in data["cells"].items()}
-    output = {}
 
-    # Mode 0 simply outputs np for suppressed cells instead of the nominal
-    if mode == 0:
-        col_headers = ["cell", "publication", "sensitive"]
-        for cell, supp in supp_levels.items():
-            published = "np" if supp > 0.5 else data["cells"][cell]["nominal"]
-            output[cell] = {"cell": cell,
-                            "publication": published,
-                            "sensitive": sensitive[cell]}
-            print("{:4.0f}: {} {}".format(cell, published, sensitive[cell]))
+def solution(data, supp_levels, bounds, mode, output_file, threads=1, output_format="", quiet=False):
+    """Prints the results in the specified format (mode). If an output_file is specified it is stored there. The number of
+    threads is used to solve the consistent table in mode 2.
 
-    elif mode == 1 or mode == 2:
+    The rows are written as they are produced so the output file can be a named pipe. The output format is csv, jsonl or
+    columnar, and is inferred from the extension of the output file if it is not given. If quiet is True nothing is printed
+    for the individual cells"""
+
+    if mode not in COLUMNS:
+        raise ValueError("Unknown output mode {}".format(mode))
+
+    # Mode 2 solves an LP to determine a consistent table with minimal additional errors. Gurobi is only needed by mode 2
+    if mode == 2:
+        from consistent import find_most_central_consistent_solution
+        find_most_central_consistent_solution(data, bounds, threads)
+
+    writer = open_writer(output_file, output_format, mode) if output_file else None
+    for row in rows(data, supp_levels, bounds, mode, quiet):
+        if writer:
+            writer.write(row)
+
+    if writer:
+        writer.close()
+
+
+def rows(data, supp_levels, bounds, mode, quiet=False):
+    """Yields the output row of each cell in the specified format (mode), and prints it unless quiet is True"""
+
+    for cell, supp in supp_levels.items():
+        info = data["cells"][cell]
+
+        # Sensitive cells are given an * in the output
+        sensitive = "*" if info["sensitive"] else ""
+
+        # Mode 0 simply outputs np for suppressed cells instead of the nominal
+        if mode == 0:
+            published = "np" if supp > 0.5 else info["nominal"]
+            row = {"cell": cell,
+                   "publication": published,
+                   "sensitive": sensitive}
+            if not quiet:
+                print("{:4.0f}: {} {}".format(cell, published, sensitive))
 
         # Mode 1 outputs a lower an upper bound for suppressed cells instead of the nominal
-        if mode == 1:
-            col_headers = ["cell", "published_lower_bound", "published_upper_bound", "suppressed", "sensitive"]
-            for cell, supp in supp_levels.items():
-                published = (bounds[cell][0], bounds[cell][1]) if supp > 0.5 else data["cells"][cell]["nominal"]
-
-                output[cell] = {"cell": cell,
-                                "published_lower_bound": bounds[cell][0],
-                                "published_upper_bound": bounds[cell][1],
-                                "suppressed": True if supp > 0.5 else False,
-                                "sensitive": sensitive[cell]}
-                print("{:4.0f}: {} {}".format(cell, published, sensitive[cell]))
+        elif mode == 1:
+            row = {"cell": cell,
+                   "published_lower_bound": bounds[cell][0],
+                   "published_upper_bound": bounds[cell][1],
+                   "suppressed": True if supp > 0.5 else False,
+                   "sensitive": sensitive}
+            if not quiet:
+                published = (bounds[cell][0], bounds[cell][1]) if supp > 0.5 else info["nominal"]
+                print("{:4.0f}: {} {}".format(cell, published, sensitive))
 
         # Mode 2 outputs a consistent table where the suppressed cells have error bars
         else:
 
-            # Solves an LP to determine a consistent table with minimal additional errors
-            find_most_central_consistent_solution(data, bounds)
-            col_headers = ["cell", "published nominal", "published error", "suppressed", "sensitive"]
+            # output format changes for suppressed cells
+            if supp > 0.5:
+                error = info["new_diff"]/info["new_nominal"]*100
+                if not quiet:
+                    print ("{:4.0f}: {:8.1f} (+- {:1.1f}%) {}".format(cell, info["new_nominal"],
+                                                                      error,
+                                                                      sensitive))
 
-            for cell, supp in supp_levels.items():
-                info = data["cells"][cell]
+            else:
+                error = 0
+                if not quiet:
+                    print("{:4.0f}: {:8.1f} {}".format(cell, info["nominal"], sensitive))
 
-                # output format changes for suppressed cells
-                if supp > 0.5:
+            row = {"cell": cell,
+                   "published nominal": info["new_nominal"],
+                   "published error": error,
+                   "suppressed": True if supp > 0.5 else False,
+                   "sensitive": sensitive}
 
-                    error = info["new_diff"]/info["new_nominal"]*100
-                    print ("{:4.0f}: {:8.1f} (+- {:1.1f}%) {}".format(cell, info["new_nominal"],
-                                                                      error,
-                                                                      sensitive[cell]))
-
-                else:
-                    error = 0
-                    print("{:4.0f}: {:8.1f} {}".format(cell, info["nominal"], sensitive[cell]))
-
-                output[cell] = {"cell": cell,
-                                "published nominal": info["new_nominal"],
-                                "published error": error,
-                                "suppressed": True if supp > 0.5 else False,
-                                "sensitive": sensitive[cell]}
-
-    # Store in output file if one is specified
-    if output_file:
-        with open(output_file, "wb") as f_out:
-
-            # Use the standard csv library
-            writer = csv.DictWriter(f_out, fieldnames=col_headers)
-            writer.writeheader()
-            for cell, info in output.items():
-                writer.writerow(info)
+        yield row
+
+
+def open_writer(output_file, output_format, mode):
+    """Opens a writer for the output file in the given format. If no format is given it is inferred from the extension"""
+
+    if not output_format:
+        if output_file.endswith(".jsonl") or output_file.endswith(".json"):
+            output_format = "jsonl"
+        elif output_file.endswith(".col"):
+            output_format = "columnar"
+        else:
+            output_format = "csv"
+
+    if output_format == "csv":
+        return CSVWriter(output_file, mode)
+    elif output_format == "jsonl":
+        return JSONLinesWriter(output_file, mode)
+    elif output_format == "columnar":
+        return ColumnarWriter(output_file, mode)
+    raise ValueError("Unknown output format {}".format(output_format))
+
+
+class CSVWriter:
+    """Writes the rows to a csv file using the standard csv library"""
+
+    def __init__(self, output_file, mode):
+        self.f_out = open(output_file, "wb")
+        self.writer = csv.DictWriter(self.f_out, fieldnames=[name for name, _ in COLUMNS[mode]])
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.f_out.close()
+
+
+class JSONLinesWriter:
+    """Writes each row as a JSON object on its own line"""
+
+    def __init__(self, output_file, mode):
+        self.f_out = open(output_file, "w")
+
+    def write(self, row):
+        self.f_out.write(json.dumps(row) + "\n")
+
+    def close(self):
+        self.f_out.close()
+
+
+class ColumnarWriter:
+    """Writes the rows in a compact binary columnar format. The file starts with the line SUPPCOL1, followed by a line with
+    a JSON list of [column name, array type code] pairs. The rows are then written in blocks, where each block is the number
+    of rows as a little endian unsigned int followed by the little endian values of each column in turn. The publication of
+    suppressed cells in mode 0 is stored as NaN, and booleans and the sensitive marker are stored as 0 or 1. Cells must have
+    integer ids."""
+
+    def __init__(self, output_file, mode, block_size=65536):
+        self.f_out = open(output_file, "wb")
+        self.columns = COLUMNS[mode]
+        self.block_size = block_size
+        self.f_out.write(COLUMNAR_MAGIC)
+        self.f_out.write((json.dumps(self.columns) + "\n").encode("ascii"))
+        self.arrays = self.new_arrays()
+
+    def new_arrays(self):
+        return [array(code) for _, code in self.columns]
+
+    def write(self, row):
+        for (name, code), values in zip(self.columns, self.arrays):
+            value = row[name]
+            if name == "publication" and value == "np":
+                value = float("nan")
+            elif name == "sensitive":
+                value = 1 if value else 0
+            elif code == "B":
+                value = int(value)
+            values.append(value)
+
+        if len(self.arrays[0]) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the stored rows as a block"""
+
+        if not len(self.arrays[0]):
+            return
+
+        self.f_out.write(struct.pack("<I", len(self.arrays[0])))
+        for values in self.arrays:
+            if sys.byteorder == "big":
+                values.byteswap()
+            self.f_out.write(values.tobytes() if hasattr(values, "tobytes") else values.tostring())
+        self.f_out.flush()
+        self.arrays = self.new_arrays()
+
+    def close(self):
+        self.flush()
+        self.f_out.close()